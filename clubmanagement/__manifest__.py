@@ -20,7 +20,7 @@ Long description of module's purpose
     # Check https://github.com/odoo/odoo/blob/15.0/odoo/addons/base/data/ir_module_category_data.xml
     # for the full list
     'category': 'Association',
-    'version': '18.0.0.2.0',
+    'version': '18.0.0.3.0',
     'application': True,
     'auto_install': False,
     'installable': True,
@@ -56,6 +56,8 @@ Long description of module's purpose
         'security/club_role.ir_rule.xml',
         'security/club_api_config.ir_rule.xml',
         'security/res_partner.ir_rule.xml',
+        'data/club_member_state_rule_cron.xml',
+        'data/club_log_cron.xml',
         'views/contacts_contacts.xml',
         'views/club_00_menu_root.xml',
         'views/club_20_menu_members.xml',
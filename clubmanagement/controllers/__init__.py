@@ -2,6 +2,8 @@
 
 from . import controllers
 from . import club_dashboard
+from . import club_audit_log
 from . import club_api_security_mixin
 from . import club_member_api
-from . import club_lookup_api
\ No newline at end of file
+from . import club_lookup_api
+from . import club_orgchart
\ No newline at end of file
@@ -0,0 +1,18 @@
+from odoo import http
+from odoo.http import request
+
+class ClubAuditLogController(http.Controller):
+    @http.route('/clubmanagement/audit_log/page', type='json', auth='user')
+    def audit_log_page(self, scope_type=None, model=None, res_id=None, activity_type=None, cursor=None, limit=80):
+        # Keyset-Paginierung: next_cursor der Antwort als cursor der nächsten Seite übergeben
+        page = request.env['club.log'].browse_page(
+            scope_type=scope_type,
+            model=model,
+            res_id=res_id,
+            activity_type=activity_type,
+            cursor=cursor,
+            limit=limit,
+        )
+        for record in page['records']:
+            record['create_date'] = record['create_date'].isoformat() if record['create_date'] else None
+        return page
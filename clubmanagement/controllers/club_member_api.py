@@ -127,32 +127,30 @@ class ClubMemberAPIController(http.Controller, ClubApiSecurityMixin):
                     {"status": "failed", "error": str(member_errors)}, api_conf, status=422
                 )
 
-            # 9️⃣ Transaktion starten
-            env.cr.execute("SAVEPOINT api_register_member")
-
-            # ➓ Zusatzfelder setzen – Partner wird automatisch via _inherits erzeugt
-            validated_member.update({
-                "company_id": company.id,
-                "club_id": api_conf.club_id.id,
-            })
-
-            # Name-Fallback falls partner_firstname aus irgendeinem Grund nicht greift
-            if not validated_member.get("name"):
-                fn = validated_member.get("firstname", "").strip()
-                ln = validated_member.get("lastname", "").strip()
-                validated_member["name"] = (fn + " " + ln).strip()
-
-            # 👉 Nur noch club.member.create() – Partner wird implizit erzeugt
-            api_user = api_conf.user_id or env.ref("base.user_admin")
-            member = (
-                env["club.member"]
-                .with_user(api_user)
-                .with_company(company)
-                .with_context(mail_create_nolog=True, mail_create_nosubscribe=True)
-                .create(validated_member)
-            )
-
-            env.cr.execute("RELEASE SAVEPOINT api_register_member")
+            # 9️⃣ Transaktion starten – ein Rollback des Savepoints verwirft
+            # auch die bis dahin gepufferten Log-Einträge
+            with env.cr.savepoint():
+                # ➓ Zusatzfelder setzen – Partner wird automatisch via _inherits erzeugt
+                validated_member.update({
+                    "company_id": company.id,
+                    "club_id": api_conf.club_id.id,
+                })
+
+                # Name-Fallback falls partner_firstname aus irgendeinem Grund nicht greift
+                if not validated_member.get("name"):
+                    fn = validated_member.get("firstname", "").strip()
+                    ln = validated_member.get("lastname", "").strip()
+                    validated_member["name"] = (fn + " " + ln).strip()
+
+                # 👉 Nur noch club.member.create() – Partner wird implizit erzeugt
+                api_user = api_conf.user_id or env.ref("base.user_admin")
+                member = (
+                    env["club.member"]
+                    .with_user(api_user)
+                    .with_company(company)
+                    .with_context(mail_create_nolog=True, mail_create_nosubscribe=True)
+                    .create(validated_member)
+                )
 
             # 🔟 Antwort aufbauen
             result = {
@@ -0,0 +1,18 @@
+from odoo import http
+from odoo.http import request
+
+class ClubOrgChartController(http.Controller):
+    @http.route('/clubmanagement/orgchart', type='http', auth='user', methods=['GET'])
+    def orgchart(self, **kwargs):
+        # Gleiche Leserechte wie die Club-Ansichten; das Dokument ist je Firma und Version gecacht
+        request.env['club.club'].check_access('read')
+        etag, body = request.env['club.orgchart']._get_orgchart(request.env.company.id)
+
+        headers = [
+            ('ETag', f'"{etag}"'),
+            ('Cache-Control', 'private, no-cache'),
+        ]
+        # Revalidierung: unverändertes Org Chart kostet nur ein 304
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+        return request.make_response(body, headers=headers + [('Content-Type', 'application/json; charset=utf-8')])
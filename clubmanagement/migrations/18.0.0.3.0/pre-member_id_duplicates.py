@@ -0,0 +1,32 @@
+import logging
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    # Doppelte Member IDs (früherer Batch-Fehler) verhindern den UNIQUE
+    # Constraint; Odoo würde ihn dann nur mit einer Warnung auslassen.
+    # Der älteste Member behält seine ID, alle weiteren erhalten neue IDs
+    # hinter der höchsten vergebenen.
+    cr.execute("""
+        WITH numbered AS (
+            SELECT id, member_id, row_number() OVER (PARTITION BY member_id ORDER BY id) AS rn
+              FROM club_member
+             WHERE member_id IS NOT NULL
+        ),
+        renumbered AS (
+            SELECT id, member_id AS old_member_id,
+                   (SELECT COALESCE(MAX(member_id), 0) FROM club_member) + row_number() OVER (ORDER BY id) AS new_member_id
+              FROM numbered
+             WHERE rn > 1
+        )
+        UPDATE club_member m
+           SET member_id = r.new_member_id
+          FROM renumbered r
+         WHERE m.id = r.id
+     RETURNING m.id, r.old_member_id, r.new_member_id
+    """)
+    rows = cr.fetchall()
+    if rows:
+        _logger.warning('Renumbered %s members with duplicate member IDs before adding the unique constraint', len(rows))
+        for record_id, old_member_id, new_member_id in sorted(rows):
+            _logger.warning('club.member %s: member ID %s -> %s', record_id, old_member_id, new_member_id)
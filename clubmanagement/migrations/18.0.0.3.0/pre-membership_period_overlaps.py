@@ -0,0 +1,54 @@
+import logging
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    # Aktive Mitgliedschaften eines Members dürfen sich ab dieser Version
+    # nicht überlappen (Exclusion Constraint mit Übergabetag, '[)'). Bestehende
+    # Überlappungen werden einmalig wie in set_membership() bereinigt: gleich
+    # beginnende ältere Einträge werden deaktiviert, alle anderen enden am
+    # Beginn der nächsten Mitgliedschaft.
+    cr.execute("SELECT to_regclass('club_member_membership_history') IS NOT NULL")
+    if not cr.fetchone()[0]:
+        return
+
+    # Die frühere Version mit inklusivem Enddatum würde die bereinigten,
+    # aneinander anschliessenden Zeiträume ablehnen; init() legt ihn neu an
+    cr.execute("""
+        ALTER TABLE club_member_membership_history
+        DROP CONSTRAINT IF EXISTS club_member_membership_history_no_overlap
+    """)
+
+    cr.execute("""
+        UPDATE club_member_membership_history h
+           SET active = FALSE
+          FROM club_member_membership_history newer
+         WHERE newer.member_id = h.member_id AND newer.active AND h.active
+           AND newer.date_start = h.date_start AND newer.id > h.id
+     RETURNING h.id, h.member_id, h.date_start
+    """)
+    deactivated = cr.fetchall()
+    if deactivated:
+        _logger.warning('Deactivated %s memberships starting on the same day as a newer membership', len(deactivated))
+        for record_id, member_id, date_start in sorted(deactivated):
+            _logger.warning('club.member.membership.history %s (member %s, start %s): deactivated', record_id, member_id, date_start)
+
+    cr.execute("""
+        WITH ordered AS (
+            SELECT id, date_end,
+                   lead(date_start) OVER (PARTITION BY member_id ORDER BY date_start, id) AS next_start
+              FROM club_member_membership_history
+             WHERE active
+        )
+        UPDATE club_member_membership_history h
+           SET date_end = o.next_start
+          FROM ordered o
+         WHERE h.id = o.id AND o.next_start IS NOT NULL
+           AND (o.date_end IS NULL OR o.date_end > o.next_start)
+     RETURNING h.id, h.member_id, o.date_end, o.next_start
+    """)
+    closed = cr.fetchall()
+    if closed:
+        _logger.warning('Closed %s overlapping memberships at the start of the next membership', len(closed))
+        for record_id, member_id, old_end, new_end in sorted(closed):
+            _logger.warning('club.member.membership.history %s (member %s): end date %s -> %s', record_id, member_id, old_end or 'open', new_end)
@@ -4,6 +4,8 @@ from . import res_partner
 from . import hr_employee
 from . import res_config_settings
 from . import clublog
+from . import club_org_closure
+from . import club_orgchart
 from . import club
 from . import clubsubclub
 from . import clubboard
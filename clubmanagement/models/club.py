@@ -11,7 +11,9 @@ class Club(models.Model):
     _inherit = [
         'mail.thread',
         'mail.activity.mixin',
-        'club.log.mixin'
+        'club.log.mixin',
+        'club.org.unit.mixin',
+        'club.orgchart.mixin',
     ]
 
     name                = fields.Char(string="Name", required=True, tracking=True)
@@ -22,7 +24,7 @@ class Club(models.Model):
     pool_ids            = fields.One2many(string="Pools", comodel_name='club.pool', inverse_name='club_id')
     role_ids            = fields.One2many(string="Roles / Functions", comodel_name='club.role', inverse_name='club_id')
     member_ids          = fields.Many2many(string="Members", comodel_name='club.member', relation='club_club_member_rel', column1='club_id', column2='member_id')
-    member_ids_display  = fields.Many2many(string="All Members", comodel_name='club.member', compute='_compute_member_ids', store=False)
+    member_ids_display  = fields.Many2many(string="All Members", comodel_name='club.member', compute='_compute_member_ids', search='_search_member_ids_display', store=False)
     active              = fields.Boolean(default=True)
 
     @api.model
@@ -30,14 +32,12 @@ class Club(models.Model):
         _logger.info('Initializing model: %s', self._name)
         super().init()
 
-    @api.depends('member_ids', 'subclub_ids.member_ids_display', 'department_ids.member_ids_display')
+    @api.depends('member_ids', 'subclub_ids.member_ids', 'department_ids.member_ids')
     def _compute_member_ids(self):
+        # Aus der Member-Closure (club.org.closure)
+        closure = self._get_closure_member_ids()
         for club in self:
-            direct = club.member_ids
-            subclub_members = club.subclub_ids.mapped('member_ids_display')
-            dept_members = club.department_ids.mapped('member_ids_display')
-            all_members = direct | subclub_members | dept_members
-            club.member_ids_display = [(6, 0, all_members.ids)]
+            club.member_ids_display = [(6, 0, closure.get(club.id, []))]
             
 
     def view_config_roles_action(self):
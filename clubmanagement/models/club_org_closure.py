@@ -0,0 +1,372 @@
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError
+
+from contextlib import contextmanager
+import logging
+import psycopg2
+_logger = logging.getLogger(__name__)
+
+#####################################
+# Club Org Closure
+#------------------------------------
+# class ClubOrgClosure: Member ↔ Organisationseinheit (transitiv)
+# class ClubOrgUnitMixin: abstract model für Club, Subclub, Department, Pool, Team
+#####################################
+
+# Organisationseinheiten mit Closure-Zeilen
+CLOSURE_UNIT_MODELS = ['club.club', 'club.subclub', 'club.department', 'club.pool', 'club.team']
+# Tabellen, die die Closure-Query liest
+CLOSURE_SOURCE_TABLES = [
+    'club_member', 'club_club_member_rel', 'club_subclub_member_rel', 'club_department_member_rel',
+    'club_pool_member_rel', 'club_team_member_rel',
+]
+# Member-Felder, deren Änderung die Closure betrifft
+CLOSURE_MEMBER_FIELDS = ['subclub_ids', 'department_ids', 'pool_ids', 'team_ids']
+CLOSURE_REFRESH_BATCH_SIZE = 5000
+# Nicht gespeicherte Felder der Einheiten, die aus der Closure berechnet werden
+CLOSURE_COMPUTE_METHODS = ('_compute_member_ids', '_compute_member_count')
+# Vorgemerkte Member im Roster-Batch-Modus (cr.precommit.data)
+CLOSURE_PENDING_KEY = 'club.org.closure.pending'
+
+# Soll-Zustand der Closure für eine Menge von Membern. Archivierte Einheiten
+# behalten ihre eigenen Zeilen, geben Member aber nicht nach oben weiter
+# (wie die bisherigen One2many-Felder, die archivierte Einheiten ausblenden).
+CLOSURE_REFRESH_QUERY = """
+    WITH m AS (
+        SELECT unnest(%(member_ids)s::int[]) AS member_id
+    ),
+    team AS (
+        SELECT r.member_id, r.team_id AS unit_id
+          FROM club_team_member_rel r JOIN m USING (member_id)
+    ),
+    pool AS (
+        SELECT r.member_id, r.pool_id AS unit_id
+          FROM club_pool_member_rel r JOIN m USING (member_id)
+        UNION
+        SELECT team.member_id, t.pool_id
+          FROM team JOIN club_team t ON t.id = team.unit_id AND t.active
+         WHERE t.pool_id IS NOT NULL
+    ),
+    department AS (
+        SELECT r.member_id, r.department_id AS unit_id
+          FROM club_department_member_rel r JOIN m USING (member_id)
+        UNION
+        SELECT team.member_id, t.department_id
+          FROM team JOIN club_team t ON t.id = team.unit_id AND t.active
+         WHERE t.department_id IS NOT NULL
+        UNION
+        SELECT pool.member_id, p.department_id
+          FROM pool JOIN club_pool p ON p.id = pool.unit_id AND p.active
+         WHERE p.department_id IS NOT NULL
+    ),
+    subclub AS (
+        SELECT r.member_id, r.subclub_id AS unit_id
+          FROM club_subclub_member_rel r JOIN m USING (member_id)
+        UNION
+        SELECT department.member_id, d.subclub_id
+          FROM department JOIN club_department d ON d.id = department.unit_id AND d.active
+         WHERE d.subclub_id IS NOT NULL
+    ),
+    club AS (
+        SELECT r.member_id, r.club_id AS unit_id
+          FROM club_club_member_rel r JOIN m USING (member_id)
+        UNION
+        SELECT subclub.member_id, s.club_id
+          FROM subclub JOIN club_subclub s ON s.id = subclub.unit_id AND s.active
+         WHERE s.club_id IS NOT NULL
+        UNION
+        SELECT department.member_id, d.club_id
+          FROM department JOIN club_department d ON d.id = department.unit_id AND d.active
+         WHERE d.club_id IS NOT NULL
+    ),
+    desired AS (
+        SELECT 'club.team' AS unit_model, unit_id, member_id FROM team
+        UNION ALL SELECT 'club.pool', unit_id, member_id FROM pool
+        UNION ALL SELECT 'club.department', unit_id, member_id FROM department
+        UNION ALL SELECT 'club.subclub', unit_id, member_id FROM subclub
+        UNION ALL SELECT 'club.club', unit_id, member_id FROM club
+    ),
+    removed AS (
+        DELETE FROM club_org_closure c
+         WHERE c.member_id = ANY(%(member_ids)s)
+           AND NOT EXISTS (
+                SELECT 1 FROM desired d
+                 WHERE d.unit_model = c.unit_model AND d.unit_id = c.unit_id AND d.member_id = c.member_id
+           )
+     RETURNING c.unit_model, c.unit_id
+    ),
+    inserted AS (
+        INSERT INTO club_org_closure (unit_model, unit_id, member_id)
+        SELECT unit_model, unit_id, member_id FROM desired
+        ON CONFLICT (unit_model, unit_id, member_id) DO NOTHING
+     RETURNING unit_model, unit_id
+    )
+    -- Subclubs, deren gespeicherter Mitgliederzähler sich ändert
+    SELECT DISTINCT unit_id FROM (SELECT * FROM removed UNION ALL SELECT * FROM inserted) changed
+     WHERE unit_model = 'club.subclub'
+"""
+
+class ClubOrgClosure(models.Model):
+    _name = 'club.org.closure'
+    _description = 'Member to Organizational Unit Closure'
+    _log_access = False
+
+    member_id   = fields.Many2one(string='Member', comodel_name='club.member', required=True, ondelete='cascade', index=True)
+    unit_model  = fields.Char(string='Unit Model', required=True)
+    unit_id     = fields.Integer(string='Unit ID', required=True)
+
+    _sql_constraints = [
+        ('unique_unit_member', 'UNIQUE(unit_model, unit_id, member_id)', 'A member can only be listed once per unit!'),
+    ]
+
+    @api.model
+    def init(self):
+        _logger.info('Initializing model: %s', self._name)
+        super().init()
+        # Erstbefüllung bei bestehenden Daten (bei Neuinstallation existieren
+        # die Quelltabellen hier noch nicht – dann gibt es auch keine Member)
+        self.env.cr.execute("SELECT bool_and(to_regclass(t) IS NOT NULL) FROM unnest(%s::text[]) AS t", [CLOSURE_SOURCE_TABLES])
+        if not self.env.cr.fetchone()[0]:
+            return
+        self.env.cr.execute("SELECT EXISTS (SELECT 1 FROM club_org_closure)")
+        if not self.env.cr.fetchone()[0]:
+            self.env.cr.execute("SELECT id FROM club_member")
+            member_ids = [row[0] for row in self.env.cr.fetchall()]
+            if member_ids:
+                _logger.info('Building member closure for %s members', len(member_ids))
+                self._refresh_members(member_ids)
+
+    ########################
+    # MAINTENANCE
+    ########################
+    @api.model
+    def _refresh_members(self, member_ids):
+        """Gleicht die Closure-Zeilen der Member mit dem Soll-Zustand ab:
+        fügt nur fehlende Zeilen ein und löscht nur überzählige. Im
+        Roster-Batch-Modus (Kontext club_roster_batch) werden die Member nur
+        vorgemerkt und am Ende des Batches bzw. vor dem Commit einmal
+        abgeglichen."""
+        member_ids = set(member_ids)
+        if not member_ids:
+            return
+        if self.env.context.get('club_roster_batch'):
+            self._defer_refresh(member_ids)
+            return
+        self._refresh_members_now(member_ids)
+
+    @api.model
+    def _defer_refresh(self, member_ids):
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get(CLOSURE_PENDING_KEY)
+        if pending is None:
+            pending = precommit.data[CLOSURE_PENDING_KEY] = set()
+            precommit.add(self._refresh_pending)
+        pending.update(member_ids)
+
+    @api.model
+    def _refresh_pending(self):
+        pending = self.env.cr.precommit.data.pop(CLOSURE_PENDING_KEY, None)
+        if pending:
+            self._refresh_members_now(pending)
+
+    @api.model
+    @contextmanager
+    def roster_batch(self):
+        """Roster-Batch für Massenänderungen (z.B. Saisonwechsel): die
+        Hierarchie wird erst am Ende einmal für alle betroffenen Member
+        abgeglichen. Änderungen müssen über das gelieferte env laufen:
+
+            with env['club.org.closure'].roster_batch() as batch_env:
+                batch_env['club.team'].browse(team_ids).write(...)
+        """
+        batch_env = self.env(context=dict(self.env.context, club_roster_batch=True))
+        aborted = False
+        try:
+            yield batch_env
+        except psycopg2.Error:
+            # Abgebrochene Transaktion: der Rollback verwirft auch die Vormerkung
+            aborted = True
+            raise
+        finally:
+            # Auch nach einem fehlgeschlagenen Batch bleibt nichts vorgemerkt:
+            # bereits geschriebene Änderungen werden sofort abgeglichen
+            if not aborted:
+                self._refresh_pending()
+
+    @api.model
+    def _refresh_members_now(self, member_ids):
+        member_ids = sorted(set(member_ids))
+        if not member_ids:
+            return
+        self.env.flush_all()
+        subclub_ids = set()
+        for batch in tools.split_every(CLOSURE_REFRESH_BATCH_SIZE, member_ids, list):
+            self.env.cr.execute(CLOSURE_REFRESH_QUERY, {'member_ids': batch})
+            subclub_ids.update(row[0] for row in self.env.cr.fetchall())
+
+        self._invalidate_unit_member_fields()
+        self._recompute_subclub_counts(subclub_ids)
+
+    @api.model
+    def _invalidate_unit_member_fields(self):
+        """Nicht gespeicherte Closure-Felder der Einheiten (All Members, Zähler) verwerfen"""
+        for model_name in CLOSURE_UNIT_MODELS:
+            Unit = self.env[model_name]
+            Unit.invalidate_model([
+                name for name, field in Unit._fields.items()
+                if field.compute in CLOSURE_COMPUTE_METHODS and not field.store
+            ])
+
+    @api.model
+    def _recompute_subclub_counts(self, subclub_ids):
+        """Gespeicherte Mitgliederzähler nur der betroffenen Subclubs neu berechnen"""
+        if subclub_ids:
+            Subclub = self.env['club.subclub']
+            self.env.add_to_compute(Subclub._fields['members_count'], Subclub.browse(subclub_ids).exists())
+
+    @api.model
+    def _recompute_member_subclub_counts(self, member_ids):
+        """Nach (De-)Aktivierung von Membern die Zähler ihrer Subclubs neu berechnen"""
+        self._recompute_subclub_counts(self._get_member_subclub_ids(member_ids))
+
+    @api.model
+    def _get_member_subclub_ids(self, member_ids):
+        """IDs der Subclubs, in denen die Member (transitiv) sind"""
+        if not member_ids:
+            return set()
+        self.env.cr.execute("""
+            SELECT DISTINCT unit_id FROM club_org_closure
+             WHERE unit_model = 'club.subclub' AND member_id = ANY(%s)
+        """, [list(member_ids)])
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    ########################
+    # QUERIES
+    ########################
+    @api.model
+    def _get_unit_member_ids(self, unit_model, unit_ids):
+        """{unit_id: [member_id, ...]} der aktiven Member je Einheit"""
+        if not unit_ids:
+            return {}
+        self.env.cr.execute("""
+            SELECT c.unit_id, array_agg(c.member_id ORDER BY c.member_id)
+              FROM club_org_closure c
+              JOIN club_member m ON m.id = c.member_id AND m.active
+             WHERE c.unit_model = %s AND c.unit_id = ANY(%s)
+          GROUP BY c.unit_id
+        """, (unit_model, list(unit_ids)))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _get_unit_member_counts(self, unit_model, unit_ids):
+        """{unit_id: Anzahl aktiver Member} mit einem GROUP BY"""
+        if not unit_ids:
+            return {}
+        self.env.cr.execute("""
+            SELECT c.unit_id, count(*)
+              FROM club_org_closure c
+              JOIN club_member m ON m.id = c.member_id AND m.active
+             WHERE c.unit_model = %s AND c.unit_id = ANY(%s)
+          GROUP BY c.unit_id
+        """, (unit_model, list(unit_ids)))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _get_member_unit_ids(self, unit_model, member_ids):
+        """IDs der Einheiten, in denen einer der Member (transitiv) ist"""
+        if not member_ids:
+            return []
+        self.env.cr.execute("""
+            SELECT DISTINCT unit_id FROM club_org_closure
+             WHERE unit_model = %s AND member_id = ANY(%s)
+        """, (unit_model, list(member_ids)))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+
+class ClubOrgUnitMixin(models.AbstractModel):
+    _name = 'club.org.unit.mixin'
+    _description = 'Club Organizational Unit Mixin'
+
+    # Felder der Einheit, deren Änderung die Closure betrifft
+    _closure_fields = ('member_ids', 'active')
+
+    def _get_closure_member_ids(self):
+        """{unit_id: [member_id, ...]} aus der Closure (eine Query), beschränkt
+        auf Member, die der Benutzer lesen darf (wie die x2many-Felder)"""
+        closure = self.env['club.org.closure'].sudo()._get_unit_member_ids(self._name, self.ids)
+        if self.env.su:
+            return closure
+        member_ids = {member_id for member_ids in closure.values() for member_id in member_ids}
+        readable = set(self.env['club.member'].browse(member_ids)._filtered_access('read').ids)
+        return {
+            unit_id: [member_id for member_id in member_ids if member_id in readable]
+            for unit_id, member_ids in closure.items()
+        }
+
+    def _get_closure_member_counts(self):
+        """{unit_id: Anzahl Member} aus der Closure (ein GROUP BY). Greifen
+        Record Rules auf club.member, wird über die lesbaren Member gezählt."""
+        Member = self.env['club.member']
+        if not self.env.su:
+            if not Member.has_access('read'):
+                return {}
+            if self.env['ir.rule']._compute_domain(Member._name, 'read'):
+                return {unit_id: len(member_ids) for unit_id, member_ids in self._get_closure_member_ids().items()}
+        return self.env['club.org.closure'].sudo()._get_unit_member_counts(self._name, self.ids)
+
+    def _get_child_counts(self, child_model, inverse_name):
+        """{unit_id: Anzahl aktiver Untereinheiten} mit einem _read_group"""
+        if not self.ids:
+            return {}
+        groups = self.env[child_model]._read_group([(inverse_name, 'in', self.ids)], [inverse_name], ['__count'])
+        return {unit.id: count for unit, count in groups}
+
+    @api.model
+    def _read_group_department_id(self, departments, domain):
+        """group_expand der department_id von Pools und Teams: die Zählung
+        macht read_group mit einem GROUP BY (Domain und Record Rules
+        inklusive); hier kommen nur die leeren Spalten der Firma dazu"""
+        return self.env['club.department'].search([('company_id', '=', self.env.company.id)]) | departments
+
+    def _search_member_ids_display(self, operator, value):
+        if operator not in ('in', '='):
+            raise UserError(_("Unsupported search operator %s on All Members") % operator)
+        member_ids = value if isinstance(value, (list, tuple)) else [value]
+        if not self.env.su:
+            # Nicht lesbare Member verraten keine Zugehörigkeit
+            member_ids = self.env['club.member'].browse(member_ids)._filtered_access('read').ids
+        unit_ids = self.env['club.org.closure'].sudo()._get_member_unit_ids(self._name, member_ids)
+        return [('id', 'in', unit_ids)]
+
+    def _get_closure_affected_member_ids(self):
+        """Member, deren Closure von diesen Einheiten abhängt"""
+        self.flush_recordset()
+        self.env.cr.execute("""
+            SELECT member_id FROM club_org_closure WHERE unit_model = %s AND unit_id = ANY(%s)
+        """, (self._name, self.ids))
+        return {row[0] for row in self.env.cr.fetchall()} | set(self.member_ids.ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        units = super(ClubOrgUnitMixin, self).create(vals_list)
+        # Neue Einheiten haben noch keine Untereinheiten: nur direkte Member
+        member_ids = units.member_ids.ids
+        if member_ids:
+            self.env['club.org.closure']._refresh_members(member_ids)
+        return units
+
+    def write(self, vals):
+        if not any(name in vals for name in self._closure_fields):
+            return super(ClubOrgUnitMixin, self).write(vals)
+
+        member_ids = self._get_closure_affected_member_ids()
+        res = super(ClubOrgUnitMixin, self).write(vals)
+        member_ids |= set(self.member_ids.ids)
+        self.env['club.org.closure']._refresh_members(member_ids)
+        return res
+
+    def unlink(self):
+        member_ids = self._get_closure_affected_member_ids()
+        res = super(ClubOrgUnitMixin, self).unlink()
+        self.env['club.org.closure']._refresh_members(member_ids)
+        return res
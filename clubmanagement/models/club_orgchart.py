@@ -0,0 +1,195 @@
+from odoo import models, api, tools
+
+from collections import defaultdict
+import hashlib
+import json
+import logging
+_logger = logging.getLogger(__name__)
+
+#####################################
+# Club Org Chart
+#------------------------------------
+# class ClubOrgChart: Club-Hierarchie als ein JSON-Dokument (gecacht je Firma
+#                    und Version)
+# class ClubOrgChartMixin: abstract model, erhöht die Version bei Änderungen
+#####################################
+
+# Einheiten der Hierarchie mit den gelesenen Feldern
+ORGCHART_UNIT_FIELDS = {
+    'club.club': ['name'],
+    'club.subclub': ['name', 'sequence', 'club_id'],
+    'club.department': ['name', 'sequence', 'club_id', 'subclub_id'],
+    'club.pool': ['name', 'sequence', 'department_id'],
+    'club.team': ['name', 'shortname', 'sequence', 'department_id', 'pool_id'],
+    'club.board': ['name', 'group_type', 'scope_type', 'club_id', 'subclub_id', 'department_id', 'pool_id'],
+    'club.role': [
+        'name', 'code', 'role_type', 'scope_type', 'member_id',
+        'club_id', 'board_id', 'subclub_id', 'department_id', 'pool_id', 'team_id',
+    ],
+}
+# Übergeordnete Einheit je Modell, von der speziellsten zur allgemeinsten
+ORGCHART_PARENT_FIELDS = {
+    'club.subclub': ['club_id'],
+    'club.department': ['subclub_id', 'club_id'],
+    'club.pool': ['department_id'],
+    'club.team': ['pool_id', 'department_id'],
+    'club.board': ['pool_id', 'department_id', 'subclub_id', 'club_id'],
+    'club.role': ['team_id', 'board_id', 'pool_id', 'department_id', 'subclub_id', 'club_id'],
+}
+# Member-Felder, die im Org Chart (Rolleninhaber) erscheinen
+ORGCHART_MEMBER_FIELDS = ('name', 'active')
+# Diese Transaktion hat die Version erhöht (cr.precommit.data)
+ORGCHART_BUMPED_KEY = 'club.orgchart.bumped'
+# Schlüssel der Kind-Listen im JSON-Dokument
+ORGCHART_CHILD_KEYS = {
+    'club.subclub': 'subclubs',
+    'club.department': 'departments',
+    'club.pool': 'pools',
+    'club.team': 'teams',
+    'club.board': 'boards',
+    'club.role': 'roles',
+}
+
+class ClubOrgChart(models.AbstractModel):
+    _name = 'club.orgchart'
+    _description = 'Club Org Chart'
+
+    @api.model
+    def init(self):
+        _logger.info('Initializing model: %s', self._name)
+        super().init()
+        # Versionszähler je Firma: transaktional (Zeilensperre) und damit
+        # monoton in Commit-Reihenfolge, anders als write_date
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS club_orgchart_version (
+                company_id integer PRIMARY KEY REFERENCES res_company(id) ON DELETE CASCADE,
+                version integer NOT NULL DEFAULT 0
+            )
+        """)
+
+    @api.model
+    def _get_orgchart_version(self, company_id):
+        """Aktuelle Version der Hierarchie einer Firma (0 = nie geändert)"""
+        self.env.cr.execute("SELECT version FROM club_orgchart_version WHERE company_id = %s", [company_id])
+        row = self.env.cr.fetchone()
+        return row[0] if row else 0
+
+    @api.model
+    def _bump_orgchart_version(self, company_ids):
+        """Erhöht die Version der Firmen in der laufenden Transaktion; ein
+        paralleler Lauf wartet auf die Zeilensperre und sieht die Änderung
+        erst mit dem Commit"""
+        company_ids = sorted({company_id for company_id in company_ids if company_id})
+        if not company_ids:
+            return
+        self.env.cr.execute("""
+            INSERT INTO club_orgchart_version (company_id, version)
+            SELECT unnest(%s::int[]), 1
+            ON CONFLICT (company_id) DO UPDATE SET version = club_orgchart_version.version + 1
+        """, [company_ids])
+        self.env.cr.precommit.data[ORGCHART_BUMPED_KEY] = True
+
+    @api.model
+    def _get_orgchart(self, company_id):
+        """(etag, JSON-Bytes) der Hierarchie einer Firma"""
+        if self.env.cr.precommit.data.get(ORGCHART_BUMPED_KEY):
+            # Noch nicht committete Version: bei einem Rollback würde sie neu
+            # vergeben, daher nicht cachen
+            return self._render_orgchart(company_id)
+        return self._get_orgchart_cached(company_id, self._get_orgchart_version(company_id))
+
+    @tools.ormcache('company_id', 'version')
+    def _get_orgchart_cached(self, company_id, version):
+        """Gecacht, bis sich die Version ändert"""
+        return self._render_orgchart(company_id)
+
+    @api.model
+    def _render_orgchart(self, company_id):
+        document = self._build_orgchart(company_id)
+        body = json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()
+        _logger.info('Org chart built for company %s (%s bytes)', company_id, len(body))
+        return etag, body
+
+    @api.model
+    def _build_orgchart(self, company_id):
+        """Die Hierarchie mit einem search_read je Modell aufbauen"""
+        env = self.sudo().env
+        domain = [('company_id', '=', company_id)]
+
+        # 1️⃣ Alle Einheiten in Bulk lesen (ohne display_name-Auflösung)
+        rows = {
+            model_name: env[model_name].search_read(domain, ['id'] + field_names, order='id', load=None)
+            for model_name, field_names in ORGCHART_UNIT_FIELDS.items()
+        }
+        holder_ids = {role['member_id'] for role in rows['club.role'] if role['member_id']}
+        holders = {
+            member['id']: member['name']
+            for member in env['club.member'].search_read([('id', 'in', list(holder_ids))], ['name'], load=None)
+        }
+
+        # 2️⃣ Knoten bauen
+        nodes = {model_name: {} for model_name in ORGCHART_UNIT_FIELDS}
+        for model_name, records in rows.items():
+            for record in records:
+                node = {'id': record['id']}
+                node.update({
+                    name: value for name, value in record.items()
+                    if name != 'id' and name not in ORGCHART_PARENT_FIELDS.get(model_name, ())
+                })
+                if model_name == 'club.role':
+                    member_id = node.pop('member_id')
+                    node['holder'] = {'id': member_id, 'name': holders[member_id]} if member_id in holders else None
+                nodes[model_name][record['id']] = node
+
+        # 3️⃣ Kinder an die speziellste vorhandene übergeordnete Einheit hängen
+        children = defaultdict(lambda: defaultdict(list))
+        for model_name, parent_fields in ORGCHART_PARENT_FIELDS.items():
+            for record in rows[model_name]:
+                for parent_field in parent_fields:
+                    parent_model = env[model_name]._fields[parent_field].comodel_name
+                    if record[parent_field] in nodes[parent_model]:
+                        children[(parent_model, record[parent_field])][ORGCHART_CHILD_KEYS[model_name]].append(
+                            nodes[model_name][record['id']]
+                        )
+                        break
+
+        for (parent_model, parent_id), lists in children.items():
+            parent = nodes[parent_model][parent_id]
+            for key, items in lists.items():
+                items.sort(key=lambda item: (item.get('sequence') or 0, item['id']))
+                parent[key] = items
+
+        return {
+            'company_id': company_id,
+            'clubs': list(nodes['club.club'].values()),
+        }
+
+
+class ClubOrgChartMixin(models.AbstractModel):
+    _name = 'club.orgchart.mixin'
+    _description = 'Club Org Chart Version Mixin'
+
+    ########################
+    # VERSION
+    ########################
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(ClubOrgChartMixin, self).create(vals_list)
+        self.env['club.orgchart']._bump_orgchart_version(records.company_id.ids)
+        return records
+
+    def write(self, vals):
+        # Reine Member-Zuordnungen ändern das Org Chart nicht
+        if not set(vals) - {'member_ids'}:
+            return super(ClubOrgChartMixin, self).write(vals)
+        company_ids = self.company_id.ids
+        res = super(ClubOrgChartMixin, self).write(vals)
+        self.env['club.orgchart']._bump_orgchart_version(company_ids + self.company_id.ids)
+        return res
+
+    def unlink(self):
+        company_ids = self.company_id.ids
+        res = super(ClubOrgChartMixin, self).unlink()
+        self.env['club.orgchart']._bump_orgchart_version(company_ids)
+        return res
@@ -14,6 +14,7 @@ class ClubBoard(models.Model):
         'mail.thread',
         'mail.activity.mixin',
         'club.log.mixin',
+        'club.orgchart.mixin',
     ]
 
     name            = fields.Char(required=True, tracking=True)
@@ -11,7 +11,10 @@ class ClubDepartment(models.Model):
         'mail.thread',
         'mail.activity.mixin',
         'club.log.mixin',
+        'club.org.unit.mixin',
+        'club.orgchart.mixin',
     ]
+    _closure_fields = ('member_ids', 'active', 'subclub_id', 'club_id')
 
     name                    = fields.Char(string='Name', required=True, tracking=True)
     company_id              = fields.Many2one(string='Company', comodel_name='res.company', required=True, default=lambda self: self.env.company)
@@ -26,8 +29,8 @@ class ClubDepartment(models.Model):
     team_count              = fields.Integer(string='Team Count', compute="_compute_team_count", store=True)
     role_ids                = fields.One2many(string='Roles / Functions', comodel_name='club.role', inverse_name='department_id', tracking=True)
     member_ids              = fields.Many2many(string='Members', comodel_name='club.member', relation='club_department_member_rel', column1='department_id', column2='member_id', tracking=True)
-    member_ids_display      = fields.Many2many(string='All Members', comodel_name='club.member', compute='_compute_member_ids', store=True)
-    member_count            = fields.Integer(string="Member Count", compute="_compute_member_ids", store=True)
+    member_ids_display      = fields.Many2many(string='All Members', comodel_name='club.member', compute='_compute_member_ids', search='_search_member_ids_display')
+    member_count            = fields.Integer(string="Member Count", compute="_compute_member_count")
     active                  = fields.Boolean(default=True)
 
     price                   = fields.Monetary(string="Price", compute="_compute_price", store=True, currency_field='currency_id')
@@ -41,25 +44,31 @@ class ClubDepartment(models.Model):
         _logger.info('Initializing model: %s', self._name)
         super().init()
 
-    @api.depends('pool_ids')
+    @api.depends('pool_ids', 'pool_ids.active')
     def _compute_pool_count(self):
+        counts = self._get_child_counts('club.pool', 'department_id')
         for department in self:
-            department.pool_count = len(department.pool_ids)
+            department.pool_count = counts.get(department.id, 0)
 
-    @api.depends('team_ids')
+    @api.depends('team_ids', 'team_ids.active')
     def _compute_team_count(self):
+        counts = self._get_child_counts('club.team', 'department_id')
         for department in self:
-            department.team_count = len(department.team_ids)
+            department.team_count = counts.get(department.id, 0)
 
-    @api.depends('member_ids', 'pool_ids.member_ids_display', 'team_ids.member_ids_display')
+    @api.depends('member_ids', 'pool_ids.member_ids', 'team_ids.member_ids')
     def _compute_member_ids(self):
+        # Aus der Member-Closure (club.org.closure), eine Query für alle Departments
+        closure = self._get_closure_member_ids()
         for dept in self:
-            direct = dept.member_ids
-            team_members = dept.team_ids.mapped('member_ids_display')
-            pool_members = dept.pool_ids.mapped('member_ids_display')
-            all_members = direct | team_members | pool_members
-            dept.member_ids_display = [(6, 0, all_members.ids)]
-            member_count = len(dept.member_ids_display)
+            dept.member_ids_display = [(6, 0, closure.get(dept.id, []))]
+
+    @api.depends('member_ids', 'pool_ids.member_ids', 'team_ids.member_ids')
+    def _compute_member_count(self):
+        # Ein GROUP BY über die Closure, ohne die Member-IDs zu laden
+        counts = self._get_closure_member_counts()
+        for dept in self:
+            dept.member_count = counts.get(dept.id, 0)
 
     @api.depends('main_product_id')
     def _compute_main_product_price(self):
@@ -1,7 +1,15 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError, UserError, AccessError
+from odoo.tools import SQL
 
+from dateutil.relativedelta import relativedelta
+from datetime import date, datetime
+import gzip
+import hashlib
+import json
 import logging
+import os
+import re
 _logger = logging.getLogger(__name__)
 
 #####################################
@@ -11,6 +19,36 @@ _logger = logging.getLogger(__name__)
 # class ClubLogMixin: abstract model
 #####################################
 
+# Spalten, die log_event()/log_events() befüllen
+LOG_EVENT_FIELDS = ['scope_type', 'activity_type', 'model', 'res_id', 'res_name', 'description', 'old_value', 'new_value', 'changes']
+# Maximale Zeilen pro INSERT
+LOG_INSERT_BATCH_SIZE = 1000
+# Puffer der Log-Einträge der laufenden Transaktion (cr.precommit.data)
+LOG_BUFFER_KEY = 'club.log.buffer'
+
+# Felder, die der ClubLogMixin nie protokolliert (Bilder, mail.thread, ...)
+LOG_EXCLUDED_FIELD_TYPES = ('binary', 'one2many')
+LOG_EXCLUDED_FIELD_PREFIXES = ('message_', 'activity_', 'website_message_', 'image_', 'avatar_', 'signup_')
+# Maximale Länge von Texten im Diff (Zeichen)
+DEFAULT_LOG_PAYLOAD_LIMIT = 4096
+# Maximale Anzahl Einträge von Listen im Diff (z.B. x2many IDs)
+LOG_MAX_LIST_ITEMS = 200
+
+# Monatspartitionen: club_log_YYYY_MM, Zeilen ohne passende Partition landen in club_log_default
+LOG_PARTITION_PATTERN = re.compile(r'^club_log_(\d{4})_(\d{2})$')
+LOG_DEFAULT_PARTITION = 'club_log_default'
+# Seitengröße des Audit-Log Browsers
+LOG_PAGE_SIZE = 80
+LOG_MAX_PAGE_SIZE = 500
+# Partitionen, die im Voraus angelegt werden (aktueller Monat + n)
+LOG_PARTITIONS_AHEAD = 2
+# Archiv im Filestore (komprimiertes NDJSON + manifest.json)
+LOG_ARCHIVE_DIR = 'club_log_archive'
+LOG_ARCHIVE_MANIFEST = 'manifest.json'
+LOG_ARCHIVE_FETCH_SIZE = 5000
+# Maximale Wartezeit auf die Sperre von club_log beim Abhängen einer Partition
+LOG_DETACH_LOCK_TIMEOUT = '10s'
+
 class ClubLog(models.Model):
     _name = 'club.log'
     _description = 'Club Logfile'
@@ -18,7 +56,8 @@ class ClubLog(models.Model):
 
     name            = fields.Char(string='Log Entry', compute='_compute_name', store=True)
     user_id         = fields.Many2one(string='User', comodel_name='res.users', default=lambda self: self.env.user, readonly=True)
-    create_date     = fields.Datetime(string='Date', readonly=True)
+    # Partitionsschlüssel, daher NOT NULL (Teil des Primärschlüssels)
+    create_date     = fields.Datetime(string='Date', readonly=True, required=True)
 
     scope_type      = fields.Selection([
                             ('club', 'Club'),
@@ -28,7 +67,8 @@ class ClubLog(models.Model):
                             ('pool', 'Pool'),
                             ('team', 'Team'),
                             ('member', 'Member'),
-                            ('role', 'Role / Function')
+                            ('role', 'Role / Function'),
+                            ('state_rule', 'Member State Rule')
                         ], string="Scope Type", required=True)
 
     activity_type   = fields.Selection([
@@ -47,16 +87,43 @@ class ClubLog(models.Model):
     description     = fields.Text(string='Description', readonly=True)
     old_value       = fields.Text(string='Old Value', readonly=True)
     new_value       = fields.Text(string='New Value', readonly=True)
+    changes         = fields.Json(string='Changes', readonly=True,
+                        help="Normalized diff {field: [old, new]} (JSONB, GIN indexed)")
+    # Anzeige: alte/neue Werte aus changes, wenn die Textspalten leer sind
+    old_value_display = fields.Text(string='Old Values', compute='_compute_value_display')
+    new_value_display = fields.Text(string='New Values', compute='_compute_value_display')
 
     @api.model
     def init(self):
         _logger.info('Initializing model: %s', self._name)
         super().init()
+        self._init_partitioning()
+        # GIN-Index für Abfragen auf geänderte Felder (changes ? 'team_ids', changes @> ...)
+        self.env.cr.execute("CREATE INDEX IF NOT EXISTS club_log_changes_gin_idx ON club_log USING gin (changes)")
+        # Keyset-Indizes passend zu den Filtern des Audit-Log Browsers
+        self.env.cr.execute("CREATE INDEX IF NOT EXISTS club_log_date_id_idx ON club_log (create_date DESC, id DESC)")
+        self.env.cr.execute("CREATE INDEX IF NOT EXISTS club_log_model_res_date_idx ON club_log (model, res_id, create_date DESC, id DESC)")
+        self.env.cr.execute("CREATE INDEX IF NOT EXISTS club_log_scope_date_idx ON club_log (scope_type, create_date DESC, id DESC)")
 
     @api.depends('scope_type', 'activity_type', 'model', 'res_name')
     def _compute_name(self):
         for log in self:
-            log.name = f"{log.scope_type.capitalize()} - {log.activity_type.capitalize()} - {log.model}: {log.res_name}"
+            log.name = self._format_name(log.scope_type, log.activity_type, log.model, log.res_name)
+
+    @api.depends('old_value', 'new_value', 'changes', 'activity_type')
+    def _compute_value_display(self):
+        for log in self:
+            changes = log.changes or {}
+            log.old_value_display = log.old_value or (
+                str({name: diff[0] for name, diff in changes.items()}) if changes and log.activity_type != 'create' else False
+            )
+            log.new_value_display = log.new_value or (
+                str({name: diff[1] for name, diff in changes.items()}) if changes and log.activity_type != 'unlink' else False
+            )
+
+    @api.model
+    def _format_name(self, scope_type, activity_type, model, res_name):
+        return f"{scope_type.capitalize()} - {activity_type.capitalize()} - {model}: {res_name}"
 
     def _get_logging_models(self):
         return [
@@ -74,8 +141,8 @@ class ClubLog(models.Model):
     ########################
     # CREATE HOOK
     ########################
-    def log_event(self, scope_type, activity_type, model, res_id, res_name, description=False, old_value=False, new_value=False):
-        self.create({
+    def log_event(self, scope_type, activity_type, model, res_id, res_name, description=False, old_value=False, new_value=False, changes=False):
+        self.log_events([{
             'scope_type': scope_type,
             'activity_type': activity_type,
             'model': model,
@@ -84,7 +151,409 @@ class ClubLog(models.Model):
             'description': description,
             'old_value': old_value,
             'new_value': new_value,
-        })
+            'changes': changes,
+        }])
+
+    def log_events(self, events):
+        """Puffert mehrere Log-Einträge (Dicts mit den Parametern von
+        log_event) für die laufende Transaktion. Geschrieben wird gesammelt
+        vor dem Commit bzw. beim Betreten/Freigeben eines Savepoints; ein
+        zurückgerollter Savepoint verwirft seine gepufferten Einträge."""
+        if not events:
+            return
+        self.check_access('create')
+
+        precommit = self.env.cr.precommit
+        buffer = precommit.data.get(LOG_BUFFER_KEY)
+        if buffer is None:
+            buffer = precommit.data[LOG_BUFFER_KEY] = []
+            precommit.add(self._flush_log_buffer)
+        uid = self.env.uid
+        buffer.extend(dict(event, user_id=uid) for event in events)
+
+    @api.model
+    def _flush_log_buffer(self):
+        """Schreibt den Puffer mit mehrzeiligen INSERTs. Der Name wird direkt
+        mitgeschrieben, damit kein UPDATE pro Zeile für das berechnete Feld
+        folgt."""
+        events = self.env.cr.precommit.data.pop(LOG_BUFFER_KEY, None)
+        if not events:
+            return
+
+        now = self.env.cr.now()
+        for batch in tools.split_every(LOG_INSERT_BATCH_SIZE, events):
+            rows = []
+            for event in batch:
+                values = [event.get(name) if event.get(name) is not False else None for name in LOG_EVENT_FIELDS]
+                if values[-1] is not None:
+                    values[-1] = json.dumps(values[-1])
+                name = self._format_name(event['scope_type'], event['activity_type'], event['model'], event['res_name'])
+                uid = event['user_id']
+                rows.append(SQL(
+                    "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                    name, uid, uid, now, uid, now, *values,
+                ))
+            self.env.cr.execute(SQL(
+                "INSERT INTO club_log (name, user_id, create_uid, create_date, write_uid, write_date, %s) VALUES %s",
+                SQL(", ").join(SQL.identifier(name) for name in LOG_EVENT_FIELDS),
+                SQL(", ").join(rows),
+            ))
+
+    ########################
+    # PARTITIONING
+    #-----------------------
+    # club_log ist nach create_date monatlich partitioniert. Alte
+    # Partitionen werden abgehängt und ins Archiv exportiert – es werden
+    # nie einzelne Zeilen gelöscht.
+    ########################
+    def _init_partitioning(self):
+        """Wandelt eine bestehende, nicht partitionierte club_log Tabelle
+        einmalig in eine nach Monaten partitionierte Tabelle um."""
+        cr = self.env.cr
+        cr.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('club_log')")
+        row = cr.fetchone()
+        if not row or row[0] == 'p':
+            return
+
+        _logger.info('Converting club_log to a table partitioned by month')
+        # 1️⃣ Neue partitionierte Tabelle mit gleicher Struktur
+        cr.execute("UPDATE club_log SET create_date = COALESCE(write_date, now() at time zone 'UTC') WHERE create_date IS NULL")
+        cr.execute("""
+            CREATE TABLE club_log_partitioned (LIKE club_log INCLUDING DEFAULTS INCLUDING COMMENTS)
+            PARTITION BY RANGE (create_date)
+        """)
+        cr.execute(f"CREATE TABLE {LOG_DEFAULT_PARTITION} PARTITION OF club_log_partitioned DEFAULT")
+
+        # 2️⃣ Partitionen für alle vorhandenen Monate, dann Daten kopieren
+        cr.execute("SELECT DISTINCT date_trunc('month', create_date)::date FROM club_log")
+        for (month,) in cr.fetchall():
+            self._ensure_log_partition(month, table='club_log_partitioned')
+        cr.execute("INSERT INTO club_log_partitioned SELECT * FROM club_log")
+
+        # 3️⃣ Tabelle tauschen; die ID-Sequenz bleibt erhalten
+        cr.execute("ALTER SEQUENCE club_log_id_seq OWNED BY NONE")
+        cr.execute("DROP TABLE club_log")
+        cr.execute("ALTER TABLE club_log_partitioned RENAME TO club_log")
+        cr.execute("ALTER SEQUENCE club_log_id_seq OWNED BY club_log.id")
+        cr.execute("ALTER TABLE club_log ADD CONSTRAINT club_log_pkey PRIMARY KEY (id, create_date)")
+
+        today = fields.Date.today().replace(day=1)
+        for offset in range(LOG_PARTITIONS_AHEAD + 1):
+            self._ensure_log_partition(today + relativedelta(months=offset))
+
+    @api.model
+    def _ensure_log_partition(self, month, table='club_log'):
+        """Legt die Monatspartition an. Lief der Cron nicht rechtzeitig,
+        liegen Zeilen des Monats in der Default-Partition; diese werden
+        zuerst in die neue Tabelle verschoben, die danach angehängt wird
+        (sonst schlägt CREATE ... PARTITION OF fehl)."""
+        cr = self.env.cr
+        month = month.replace(day=1)
+        name = f"club_log_{month:%Y_%m}"
+        month_end = month + relativedelta(months=1)
+
+        cr.execute("SELECT to_regclass(%s), to_regclass(%s)", [name, LOG_DEFAULT_PARTITION])
+        exists, has_default = cr.fetchone()
+        if exists:
+            return name
+
+        stray_rows = False
+        if has_default:
+            cr.execute(SQL(
+                "SELECT EXISTS (SELECT 1 FROM %s WHERE create_date >= %s AND create_date < %s)",
+                SQL.identifier(LOG_DEFAULT_PARTITION), month, month_end,
+            ))
+            stray_rows = cr.fetchone()[0]
+
+        if not stray_rows:
+            cr.execute(SQL(
+                "CREATE TABLE %s PARTITION OF %s FOR VALUES FROM (%s) TO (%s)",
+                SQL.identifier(name), SQL.identifier(table), month, month_end,
+            ))
+            return name
+
+        # 1️⃣ Eigenständige Tabelle, 2️⃣ Zeilen aus der Default-Partition verschieben, 3️⃣ anhängen
+        cr.execute(SQL(
+            "CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+            SQL.identifier(name), SQL.identifier(table),
+        ))
+        cr.execute(SQL("""
+            WITH moved AS (
+                DELETE FROM %s WHERE create_date >= %s AND create_date < %s RETURNING *
+            )
+            INSERT INTO %s SELECT * FROM moved
+        """, SQL.identifier(LOG_DEFAULT_PARTITION), month, month_end, SQL.identifier(name)))
+        moved = cr.rowcount
+        cr.execute(SQL(
+            "ALTER TABLE %s ATTACH PARTITION %s FOR VALUES FROM (%s) TO (%s)",
+            SQL.identifier(table), SQL.identifier(name), month, month_end,
+        ))
+        _logger.info("Created club_log partition %s with %s rows moved from the default partition", name, moved)
+        return name
+
+    @api.model
+    def _get_log_partitions(self):
+        """[(partition_name, erster Tag des Monats)] aller Monatspartitionen"""
+        self.env.cr.execute("""
+            SELECT c.relname
+              FROM pg_inherits i
+              JOIN pg_class c ON c.oid = i.inhrelid
+             WHERE i.inhparent = to_regclass('club_log')
+        """)
+        partitions = []
+        for (name,) in self.env.cr.fetchall():
+            match = LOG_PARTITION_PATTERN.match(name)
+            if match:
+                partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    @api.model
+    def _get_archive_path(self):
+        path = os.path.join(self.env['ir.attachment']._filestore(), LOG_ARCHIVE_DIR)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @api.model
+    def _read_archive_manifest(self):
+        path = os.path.join(self._get_archive_path(), LOG_ARCHIVE_MANIFEST)
+        if not os.path.exists(path):
+            return {'table': self._table, 'partitions': {}}
+        with open(path, encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+
+    @api.model
+    def _write_archive_manifest(self, manifest):
+        path = os.path.join(self._get_archive_path(), LOG_ARCHIVE_MANIFEST)
+        with open(path + '.tmp', 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    @api.model
+    def _cron_maintain_partitions(self):
+        """Legt künftige Partitionen an und archiviert Partitionen, die älter
+        als clubmanagement.log_archive_months Monate sind (0 = nie)."""
+        today = fields.Date.today().replace(day=1)
+        for offset in range(LOG_PARTITIONS_AHEAD + 1):
+            self._ensure_log_partition(today + relativedelta(months=offset))
+        self.env.cr.commit()
+
+        archive_months = int(self.env['ir.config_parameter'].sudo().get_param('clubmanagement.log_archive_months') or 0)
+        if archive_months <= 0:
+            return
+        cutoff = today - relativedelta(months=archive_months)
+        for name, month in self._get_log_partitions():
+            if month < cutoff:
+                self._archive_log_partition(name, month)
+                self.env.cr.commit()
+
+    @api.model
+    def _archive_log_partition(self, name, month):
+        """Exportiert eine Partition als gzip-NDJSON in den Filestore und
+        hängt sie danach in einer kurzen eigenen Transaktion ab.
+        Der Export liest die noch angehängte Partition und sperrt club_log
+        nicht; erst DETACH braucht ACCESS EXCLUSIVE auf club_log und wird
+        sofort mit DROP und Manifest-Eintrag committed."""
+        cr = self.env.cr
+        self._flush_log_buffer()
+
+        # 1️⃣ Export aus der angehängten Partition (nur ACCESS SHARE auf der Partition)
+        cr.execute(SQL("SELECT count(*), min(id), max(id) FROM %s", SQL.identifier(name)))
+        count, min_id, max_id = cr.fetchone()
+
+        file_name = f"{name}.ndjson.gz"
+        path = os.path.join(self._get_archive_path(), file_name)
+        exported = 0
+        with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as archive_file:
+            cr.execute(SQL("SELECT row_to_json(t)::text FROM %s t ORDER BY id", SQL.identifier(name)))
+            while rows := cr.fetchmany(LOG_ARCHIVE_FETCH_SIZE):
+                for (line,) in rows:
+                    archive_file.write(line + '\n')
+                exported += len(rows)
+        if exported != count:
+            os.remove(path + '.tmp')
+            raise UserError(_("Archiving %(partition)s failed: %(exported)s of %(count)s rows exported") % {
+                'partition': name, 'exported': exported, 'count': count,
+            })
+        os.replace(path + '.tmp', path)
+
+        checksum = hashlib.sha256()
+        with open(path, 'rb') as archive_file:
+            for block in iter(lambda: archive_file.read(1024 * 1024), b''):
+                checksum.update(block)
+        cr.commit()
+
+        # 2️⃣ Kurze Transaktion: Partition sperren, Zeilenzahl prüfen, abhängen und löschen
+        cr.execute("SELECT set_config('lock_timeout', %s, true)", [LOG_DETACH_LOCK_TIMEOUT])
+        cr.execute(SQL("LOCK TABLE %s IN SHARE MODE", SQL.identifier(name)))
+        cr.execute(SQL("SELECT count(*) FROM %s", SQL.identifier(name)))
+        if cr.fetchone()[0] != count:
+            cr.rollback()
+            raise UserError(_("Archiving %s failed: the partition changed during the export") % name)
+        cr.execute(SQL("ALTER TABLE club_log DETACH PARTITION %s", SQL.identifier(name)))
+        cr.execute(SQL("DROP TABLE %s", SQL.identifier(name)))
+
+        manifest = self._read_archive_manifest()
+        manifest['partitions'][name] = {
+            'month': f"{month:%Y-%m}",
+            'file': file_name,
+            'rows': count,
+            'min_id': min_id,
+            'max_id': max_id,
+            'sha256': checksum.hexdigest(),
+            'archived_at': fields.Datetime.to_string(fields.Datetime.now()),
+        }
+        self._write_archive_manifest(manifest)
+        cr.commit()
+        _logger.info("Archived club_log partition %s (%s rows) to %s", name, count, path)
+
+    @api.model
+    def _restore_log_partition(self, name):
+        """Importiert eine archivierte Partition anhand des Manifests wieder."""
+        entry = self._read_archive_manifest()['partitions'].get(name)
+        if not entry:
+            raise UserError(_("No archive found for partition %s") % name)
+
+        path = os.path.join(self._get_archive_path(), entry['file'])
+        checksum = hashlib.sha256()
+        with open(path, 'rb') as archive_file:
+            for block in iter(lambda: archive_file.read(1024 * 1024), b''):
+                checksum.update(block)
+        if checksum.hexdigest() != entry['sha256']:
+            raise UserError(_("Checksum mismatch for archive %s") % entry['file'])
+
+        self._ensure_log_partition(datetime.strptime(entry['month'], '%Y-%m').date())
+        with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+            batch = []
+            for line in archive_file:
+                batch.append(line)
+                if len(batch) >= LOG_ARCHIVE_FETCH_SIZE:
+                    self._insert_archived_rows(batch)
+                    batch = []
+            self._insert_archived_rows(batch)
+
+        manifest = self._read_archive_manifest()
+        manifest['partitions'].pop(name, None)
+        self._write_archive_manifest(manifest)
+        _logger.info("Restored club_log partition %s (%s rows)", name, entry['rows'])
+
+    @api.model
+    def _insert_archived_rows(self, lines):
+        if lines:
+            self.env.cr.execute("""
+                INSERT INTO club_log
+                SELECT (jsonb_populate_record(NULL::club_log, row)).*
+                  FROM unnest(%s::jsonb[]) AS row
+            """, [lines])
+
+    ########################
+    # BROWSING (KEYSET)
+    ########################
+    @api.model
+    def _get_browse_domain(self, scope_type=None, model=None, res_id=None, activity_type=None):
+        domain = []
+        if scope_type:
+            domain.append(('scope_type', '=', scope_type))
+        if model:
+            domain.append(('model', '=', model))
+        if res_id:
+            domain.append(('res_id', '=', int(res_id)))
+        if activity_type:
+            domain.append(('activity_type', '=', activity_type))
+        return domain
+
+    @api.model
+    def browse_page(self, scope_type=None, model=None, res_id=None, activity_type=None, cursor=None, limit=LOG_PAGE_SIZE):
+        """Eine Seite des Audit-Logs, absteigend nach (create_date, id).
+        `cursor` ist der next_cursor der vorherigen Seite; es wird nie per
+        OFFSET geblättert. Die Gesamtzahl ist eine Schätzung des Planers.
+        Returns: {'records': [...], 'next_cursor': str|None, 'estimated_total': int}
+        """
+        limit = max(1, min(int(limit or LOG_PAGE_SIZE), LOG_MAX_PAGE_SIZE))
+        domain = self._get_browse_domain(scope_type, model, res_id, activity_type)
+
+        query = self._search(domain, order='create_date DESC, id DESC', limit=limit + 1)
+        if cursor:
+            cursor_date, cursor_id = self._parse_browse_cursor(cursor)
+            query.add_where(SQL(
+                "(%s, %s) < (%s, %s)",
+                SQL.identifier(self._table, 'create_date'), SQL.identifier(self._table, 'id'),
+                cursor_date, cursor_id,
+            ))
+        ids = list(query)
+
+        logs = self.browse(ids[:limit])
+        next_cursor = None
+        if len(ids) > limit:
+            last = logs[-1]
+            next_cursor = f"{fields.Datetime.to_string(last.create_date)}|{last.id}"
+
+        return {
+            'records': logs.read(['create_date', 'user_id', 'scope_type', 'activity_type', 'model', 'res_id', 'res_name', 'description', 'changes']),
+            'next_cursor': next_cursor,
+            'estimated_total': self._estimate_count(domain),
+        }
+
+    @api.model
+    def _parse_browse_cursor(self, cursor):
+        try:
+            cursor_date, cursor_id = cursor.rsplit('|', 1)
+            return fields.Datetime.to_datetime(cursor_date), int(cursor_id)
+        except (AttributeError, ValueError):
+            raise UserError(_("Invalid audit log cursor: %s") % cursor)
+
+    @api.model
+    def _estimate_count(self, domain):
+        """Zeilenzahl laut Planer (EXPLAIN) statt count(*)"""
+        query = self._search(domain)
+        self.env.cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query.select()))
+        plan = self.env.cr.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @api.model
+    def web_search_read(self, domain, specification, offset=0, limit=None, order=None, count_limit=None):
+        """Im Audit-Log Browser (Kontext club_log_estimate_count) liefert die
+        Listenansicht die geschätzte statt der exakten Anzahl."""
+        if not self.env.context.get('club_log_estimate_count'):
+            return super().web_search_read(domain, specification, offset=offset, limit=limit, order=order, count_limit=count_limit)
+
+        # Wie im Core eine Zeile mehr zählen, damit der Pager eine weitere Seite erkennt,
+        # auch wenn der Planer zu tief schätzt
+        count_limit = (offset or 0) + limit + 1 if limit else None
+        result = super().web_search_read(domain, specification, offset=offset, limit=limit, order=order, count_limit=count_limit)
+        if limit and len(result['records']) == limit:
+            result['length'] = max(result['length'], self._estimate_count(domain))
+        return result
+
+    ########################
+    # CHANGE QUERIES
+    ########################
+    @api.model
+    def _search_changes(self, field_name, model=None, res_id=None, new_value=None, date_from=None, date_to=None, limit=None):
+        """Log-Einträge, die `field_name` geändert haben, z.B. alle Änderungen
+        an team_ids eines Members oder wer den Status auf 'blocked' gesetzt
+        hat (new_value = state id). Nutzt den GIN-Index auf changes."""
+        self.check_access('read')
+        self._flush_log_buffer()
+        conditions = [SQL("changes ? %s", field_name)]
+        if model:
+            conditions.append(SQL("model = %s", model))
+        if res_id:
+            conditions.append(SQL("res_id = %s", res_id))
+        if new_value is not None:
+            conditions.append(SQL("changes -> %s -> 1 = %s::jsonb", field_name, json.dumps(_json_value(new_value))))
+        if date_from:
+            conditions.append(SQL("create_date >= %s", date_from))
+        if date_to:
+            conditions.append(SQL("create_date <= %s", date_to))
+
+        self.env.cr.execute(SQL(
+            "SELECT id FROM club_log WHERE %s ORDER BY create_date DESC, id DESC %s",
+            SQL(" AND ").join(conditions),
+            SQL("LIMIT %s", limit) if limit else SQL(),
+        ))
+        return self.browse(row[0] for row in self.env.cr.fetchall())
 
     ########################
     # UNLINK HOOK
@@ -100,49 +569,153 @@ class ClubLogMixin(models.AbstractModel):
     _name = 'club.log.mixin'
     _description = 'Club Log Mixin'
 
+    # Whitelist der protokollierten Felder (None = alle zulässigen Felder)
+    _log_fields = None
+    # Zusätzlich ausgeschlossene Felder
+    _log_exclude_fields = ()
+
     def _get_log_scope_type(self):
         return self._name.split('.')[1]
 
-    def create(self, vals):
-        record = super(ClubLogMixin, self).create(vals)
-        if self.env['club.log']._should_log(self._name):
-            self.env['club.log'].log_event(
-                scope_type=self._get_log_scope_type(),
-                activity_type='create',
-                model=self._name,
-                res_id=record.id,
-                res_name=record.display_name,
-                description=_("Created %s") % self._description,
-                new_value=str(vals)
-            )
-        return record
+    @api.model
+    def _get_log_fields(self):
+        """Felder, die ins Audit-Log geschrieben werden: Whitelist bzw. alle
+        gespeicherten Felder, ohne Blacklist, Binärfelder, One2many und
+        technische Felder von mail.thread/res.partner. Über _inherits geerbte
+        Felder nur, wenn sie im übergeordneten Modell gespeichert sind."""
+        names = self._log_fields if self._log_fields is not None else self._fields
+        excluded = set(self._log_exclude_fields) | set(models.MAGIC_COLUMNS)
+        stored_parent_fields = {
+            name
+            for parent_model in self._inherits
+            for name, field in self.env[parent_model]._fields.items()
+            if field.store
+        }
+        return {
+            name for name in names
+            if name in self._fields
+            and name not in excluded
+            and not name.startswith(LOG_EXCLUDED_FIELD_PREFIXES)
+            and self._fields[name].type not in LOG_EXCLUDED_FIELD_TYPES
+            and (self._fields[name].store or (self._fields[name].inherited and name in stored_parent_fields))
+        }
+
+    @api.model
+    def _get_log_payload_limit(self):
+        limit = self.env['ir.config_parameter'].sudo().get_param('clubmanagement.log_payload_limit')
+        try:
+            return int(limit) if limit else DEFAULT_LOG_PAYLOAD_LIMIT
+        except ValueError:
+            return DEFAULT_LOG_PAYLOAD_LIMIT
+
+    @api.model
+    def _read_log_values(self, records, field_names):
+        """{id: {field: wert}} normalisiert (Many2one als ID, leere Felder als
+        None) mit einem read()"""
+        if not field_names:
+            return {}
+        booleans = {name for name in field_names if records._fields[name].type == 'boolean'}
+        return {
+            row.pop('id'): {
+                name: None if value is False and name not in booleans else value
+                for name, value in row.items()
+            }
+            for row in records.read(list(field_names), load=None)
+        }
 
-    def write(self,vals):
+    @api.model
+    def _get_log_changes(self, old_values, new_values, limit):
+        """Normalisierter Diff {field: [old, new]} der geänderten Felder"""
+        return {
+            name: [_json_value(old_values.get(name), limit), _json_value(new_values.get(name), limit)]
+            for name in set(old_values) | set(new_values)
+            if old_values.get(name) != new_values.get(name)
+        }
+
+    def _get_log_event(self, activity_type, description, changes, limit):
+        self.ensure_one()
+        return {
+            'scope_type': self._get_log_scope_type(),
+            'activity_type': activity_type,
+            'model': self._name,
+            'res_id': self.id,
+            'res_name': self.display_name,
+            'description': description,
+            # old_value/new_value bleiben leer, die Anzeige leitet sie aus changes ab
+            'changes': changes,
+        }
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(ClubLogMixin, self).create(vals_list)
         if self.env['club.log']._should_log(self._name):
-            for record in self:
-                old_values = record.read(list(vals.keys()))[0]
-                self.env['club.log'].log_event(
-                    scope_type=self._get_log_scope_type(),
-                    activity_type='update',
-                    model=self._name,
-                    res_id=record.id,
-                    res_name=record.display_name,
-                    description=_("Updated %s") % self._description,
-                    old_value=str({k: v for k, v in old_values.items() if k in vals}),
-                    new_value=str(vals)
-                )
-        return super(ClubLogMixin, self).write(vals)
+            log_fields = self._get_log_fields()
+            limit = self._get_log_payload_limit()
+            description = _("Created %s") % self._description
+            written = {name for vals in vals_list for name in vals if name in log_fields}
+            new_values = self._read_log_values(records, written)
+            # Ohne protokollierte Felder (z.B. nur Defaults ausserhalb von _log_fields) kein Eintrag
+            self.env['club.log'].log_events([
+                record._get_log_event('create', description, self._get_log_changes({}, new_values[record.id], limit), limit)
+                for record in records
+                if new_values.get(record.id)
+            ])
+        return records
+
+    def write(self, vals):
+        if not self or not self.env['club.log']._should_log(self._name):
+            return super(ClubLogMixin, self).write(vals)
+
+        # Alte und neue Werte des ganzen Recordsets mit je einem read(), nur protokollierte Felder
+        log_fields = self._get_log_fields()
+        written = [name for name in vals if name in log_fields]
+        old_values = self._read_log_values(self, written)
+        res = super(ClubLogMixin, self).write(vals)
+        new_values = self._read_log_values(self, written)
+
+        limit = self._get_log_payload_limit()
+        description = _("Updated %s") % self._description
+        changes = {
+            record.id: self._get_log_changes(old_values.get(record.id, {}), new_values.get(record.id, {}), limit)
+            for record in self
+        }
+        # Ohne Änderung an protokollierten Feldern (No-op, nur andere Felder) kein Eintrag
+        self.env['club.log'].log_events([
+            record._get_log_event('update', description, changes[record.id], limit)
+            for record in self
+            if changes[record.id]
+        ])
+        return res
 
     def unlink(self):
-        if self.env['club.log']._should_log(self._name):
-            for record in self:
-                self.env['club.log'].log_event(
-                    scope_type=self._get_log_scope_type(),
-                    activity_type='unlink',
-                    model=self._name,
-                    res_id=record.id,
-                    res_name=record.display_name,
-                    description=_("Deleted %s") % self._description,
-                    old_value=str(record.read()[0])
-                )
-        return super(ClubLogMixin, self).unlink()
\ No newline at end of file
+        if self and self.env['club.log']._should_log(self._name):
+            old_values = self._read_log_values(self, self._get_log_fields())
+            limit = self._get_log_payload_limit()
+            description = _("Deleted %s") % self._description
+            self.env['club.log'].log_events([
+                record._get_log_event('unlink', description, self._get_log_changes(old_values[record.id], {}, limit), limit)
+                for record in self
+            ])
+        return super(ClubLogMixin, self).unlink()
+
+
+def _json_value(value, limit=0):
+    """Wert für den JSONB-Diff: Datum als ISO-String, Tupel als Liste,
+    lange Texte und Listen gekürzt."""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        if limit > 0 and len(value) > LOG_MAX_LIST_ITEMS:
+            return [_json_value(item, limit) for item in value[:LOG_MAX_LIST_ITEMS]] + [
+                f'... [{len(value) - LOG_MAX_LIST_ITEMS} more]'
+            ]
+        return [_json_value(item, limit) for item in value]
+    if isinstance(value, bytes):
+        return None
+    if isinstance(value, str) and limit > 0 and len(value) > limit:
+        return value[:limit] + ' ... [truncated]'
+    if isinstance(value, (bool, int, float, str, dict)):
+        return value
+    return str(value)
@@ -8,9 +8,13 @@ from datetime import date
 
 from PIL import Image
 
+from .club_org_closure import CLOSURE_MEMBER_FIELDS
+from .club_orgchart import ORGCHART_MEMBER_FIELDS
+
 import logging
 _logger = logging.getLogger(__name__)
 
+MEMBER_ID_SEQUENCE = 'club_member_member_id_seq'
 
 class ClubMember(models.Model):
     _name = 'club.member'
@@ -21,6 +25,11 @@ class ClubMember(models.Model):
         'mail.activity.mixin',
         'club.log.mixin',
     ]
+    _sql_constraints = [
+        ('unique_member_id', 'UNIQUE(member_id)', 'Member ID must be unique!')
+    ]
+    # Abgeleitete Zähler nicht protokollieren (ändern sich täglich)
+    _log_exclude_fields = ('age', 'years_in_club', 'months_in_club', 'days_in_club', 'registration_rules_pending')
 
     #
     # Personal Identification Fields
@@ -54,6 +63,8 @@ class ClubMember(models.Model):
     membership_date_start  = fields.Date(string="Membership Start Date", compute="_compute_current_membership", store=True)
     membership_date_end    = fields.Date(string="Membership End Date", compute="_compute_current_membership", store=True)
 
+    registration_rules_pending = fields.Boolean(string="Registration Rules Pending", readonly=True, copy=False,
+                                help="Registration rules are queued and will be applied by the background job")
     current_state_id       = fields.Many2one(string="Current Member State", comodel_name="club.member.state", compute="_compute_current_state", store=True)
     state_history_ids      = fields.One2many(string="Member State History", comodel_name="club.member.state.history", inverse_name="member_id")
     state_date_start       = fields.Date(string="State Start Date", compute="_compute_current_state", store=True)
@@ -73,6 +84,15 @@ class ClubMember(models.Model):
     def init(self):
         _logger.info('Initializing model: %s', self._name)
         super().init()
+        # Index für inkrementelle Regel-Auswertung (Änderungen seit Watermark)
+        self.env.cr.execute("CREATE INDEX IF NOT EXISTS club_member_write_date_idx ON club_member (write_date)")
+        # Partieller Index für die Warteschlange der verzögerten Registrierungsregeln
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS club_member_registration_rules_pending_idx
+            ON club_member (id) WHERE registration_rules_pending
+        """)
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {MEMBER_ID_SEQUENCE}")
+        self._sync_member_id_sequence()
 
     @api.depends('birthdate_date')
     def _compute_year_of_birth(self):
@@ -139,9 +159,10 @@ class ClubMember(models.Model):
     #######################################
     @api.model_create_multi
     def create(self, vals_list):
+        # Generiere Member IDs (ein Block für den ganzen Batch)
+        member_ids = iter(self._reserve_member_ids(len(vals_list)))
         for vals in vals_list:
-            # Generiere Member ID
-            vals['member_id'] = self._generate_member_id()
+            vals['member_id'] = next(member_ids)
 
         members = super(ClubMember, self).create(vals_list)
 
@@ -150,6 +171,12 @@ class ClubMember(models.Model):
                 pass
 
         self.env['club.member.state.rule']._apply_registratoin_rules(members)
+        self.env['club.member.state.rule']._queue_field_changes(members, {name for vals in vals_list for name in vals})
+
+        # Member-Closure der Organisationseinheiten nachführen
+        closure_members = members.filtered(lambda member: member.subclub_ids or member.department_ids or member.pool_ids or member.team_ids)
+        if closure_members:
+            self.env['club.org.closure']._refresh_members(closure_members.ids)
 
         for member in members:
             self.env['club.log'].log_event(
@@ -163,33 +190,71 @@ class ClubMember(models.Model):
 
         return members
 
-    def _generate_member_id(self):
-        """Generiert fortlaufende Member ID.
-        Nutzt Startwert aus den Systemeinstellungen, wenn gesetzt.
-        """
-        # 1️⃣ Letzten Member bestimmen
-        last_member = self.search([], order="member_id desc", limit=1)
-
-        # 2️⃣ Wenn schon Mitglieder vorhanden → normal weiterzählen
-        if last_member:
-            return last_member.member_id + 1
-
-        # 3️⃣ Sonst Startwert aus ResConfigSettings (Systemparameter) laden
-        IrConfig = self.env["ir.config_parameter"].sudo()
-        start_id_set = IrConfig.get_param("clubmanagement.start_member_id_set")
-        start_id_val = IrConfig.get_param("clubmanagement.start_member_id")
+    #######################################
+    # WRITE HOOK
+    #######################################
+    def write(self, vals):
+        res = super(ClubMember, self).write(vals)
+        self.env['club.member.state.rule']._queue_field_changes(self, vals.keys())
+        if any(name in vals for name in CLOSURE_MEMBER_FIELDS):
+            self.env['club.org.closure']._refresh_members(self.ids)
+        if 'active' in vals:
+            self.env['club.org.closure']._recompute_member_subclub_counts(self.ids)
+        # Rolleninhaber stehen im Org Chart
+        if any(name in vals for name in ORGCHART_MEMBER_FIELDS):
+            self.env['club.orgchart']._bump_orgchart_version(
+                self.env['club.role'].sudo().search([('member_id', 'in', self.ids)]).company_id.ids
+            )
+        return res
+
+    def unlink(self):
+        # Die Closure-Zeilen verschwinden mit den Membern (ondelete cascade):
+        # betroffene Subclubs vorher ermitteln, Zähler danach neu berechnen
+        Closure = self.env['club.org.closure']
+        subclub_ids = Closure._get_member_subclub_ids(self.ids)
+        res = super(ClubMember, self).unlink()
+        Closure._invalidate_unit_member_fields()
+        Closure._recompute_subclub_counts(subclub_ids)
+        return res
 
+    @api.model
+    def _get_start_member_id(self):
+        """Startwert aus den Systemeinstellungen (Systemparameter) laden."""
+        start_id_val = self.env["ir.config_parameter"].sudo().get_param("clubmanagement.start_member_id")
         try:
             start_id_val = int(start_id_val) if start_id_val else 1
         except ValueError:
             start_id_val = 1
+        return start_id_val if start_id_val > 0 else 1
 
-        # Wenn Startwert explizit aktiviert wurde und vorhanden ist
-        if start_id_set in ("True", True) and start_id_val > 0:
-            return start_id_val
+    @api.model
+    def _sync_member_id_sequence(self):
+        """Setzt die Member-ID-Sequenz auf den nächsten freien Wert.
+        Berücksichtigt bestehende Member IDs und den Startwert aus den
+        Systemeinstellungen. Die Sequenz wird dabei nie zurückgesetzt.
+        """
+        self.env.cr.execute(f"""
+            SELECT setval('{MEMBER_ID_SEQUENCE}', GREATEST(
+                (SELECT COALESCE(MAX(member_id), 0) + 1 FROM club_member),
+                %s,
+                (SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END FROM {MEMBER_ID_SEQUENCE})
+            ), false)
+        """, (self._get_start_member_id(),))
 
-        # 4️⃣ Standard-Fallback
-        return 1
+    @api.model
+    def _reserve_member_ids(self, count):
+        """Reserviert `count` Member IDs in einem einzigen Round-Trip.
+        Die IDs stammen aus einer PostgreSQL-Sequenz und sind damit auch bei
+        parallelen Registrierungen eindeutig, ohne auf einen MAX()-Scan zu
+        serialisieren. Ohne parallele Zugriffe ist der Block fortlaufend.
+        """
+        if count <= 0:
+            return []
+        self.env.cr.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            (MEMBER_ID_SEQUENCE, count)
+        )
+        return sorted(row[0] for row in self.env.cr.fetchall())
 
 
     ###################################
@@ -197,14 +262,32 @@ class ClubMember(models.Model):
     ###################################
     @api.depends('state_history_ids.start_date', 'state_history_ids.end_date')
     def _compute_current_state(self):
+        current_states = self._get_current_state_rows()
         for member in self:
-            current_state = self.env['club.member.state.history'].search([
-                ('member_id', '=', member.id),
-                ('start_date', '<=', fields.Datetime.now()),
-                '|', ('end_date', '=', False), ('end_date', '>', fields.Datetime.now())
-            ], order='start_date desc, id desc', limit=1)
-            member.current_state_id = current_state.state_id if current_state else False
-            member.state_date_start = current_state.start_date if current_state else False
+            state_id, start_date = current_states.get(member._origin.id, (False, False))
+            member.current_state_id = state_id
+            member.state_date_start = start_date
+
+    def _get_current_state_rows(self, at_date=None):
+        """Ermittelt den aktuellen Status für alle Member des Recordsets
+        mit einer einzigen DISTINCT ON Abfrage.
+        Returns: {member_id: (state_id, start_date)}
+        """
+        member_ids = [mid for mid in self._origin.ids if mid]
+        if not member_ids:
+            return {}
+
+        at_date = at_date or fields.Datetime.now()
+        self.env['club.member.state.history'].flush_model(['member_id', 'state_id', 'start_date', 'end_date'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (member_id) member_id, state_id, start_date
+              FROM club_member_state_history
+             WHERE member_id = ANY(%s)
+               AND start_date <= %s
+               AND (end_date IS NULL OR end_date > %s)
+          ORDER BY member_id, start_date DESC, id DESC
+        """, (member_ids, at_date, at_date))
+        return {member_id: (state_id, start_date) for member_id, state_id, start_date in self.env.cr.fetchall()}
 
     @api.depends('state_date_start')
     def _compute_state_days_since_start(self):
@@ -221,90 +304,195 @@ class ClubMember(models.Model):
                 member.state_days_in_state = 0
 
     def set_state(self, state_id, reason=None):
-        self.ensure_one()
-        current_state = self.state_history_ids.filtered(lambda r: not r.end_date)
-        if current_state:
-            current_state.write({'end_date': fields.Datetime.now()})
+        return self._bulk_change_state(state_id, reason=reason)
+
+    def _bulk_change_state(self, new_state, reason=None, start_date=None, end_date=None, member_dates=None):
+        """Statuswechsel für alle Member des Recordsets in wenigen Queries:
+        offene Status-Einträge werden mit einem UPDATE geschlossen, die neuen
+        Einträge mit einem mehrzeiligen INSERT angelegt und die Log-Einträge
+        gesammelt geschrieben. Member im Zielstatus werden übersprungen.
+        `member_dates` überschreibt optional {member_id: (start_date, end_date)}.
+        Returns: Anzahl geänderter Member
+        """
+        if isinstance(new_state, int):
+            new_state = self.env['club.member.state'].browse(new_state)
 
-        self.env['club.member.state.history'].create({
-            'member_id': self.id,
-            'state_id': state_id,
+        members = self.filtered(lambda m: m.current_state_id != new_state)
+        if not members:
+            return 0
+
+        now = fields.Datetime.now()
+        member_dates = member_dates or {}
+        transitions = []
+        for member in members:
+            member_start, member_end = member_dates.get(member.id, (start_date, end_date))
+            transitions.append((
+                member,
+                member.current_state_id,
+                fields.Datetime.to_datetime(member_start) or now,
+                fields.Datetime.to_datetime(member_end) or False,
+            ))
+
+        # 1️⃣ Offene Einträge schliessen (ein UPDATE)
+        History = self.env['club.member.state.history']
+        History.flush_model()
+        self.env.cr.execute("""
+            UPDATE club_member_state_history h
+               SET end_date = GREATEST(h.start_date, v.start_date),
+                   write_uid = %s,
+                   write_date = (now() at time zone 'UTC')
+              FROM unnest(%s::int[], %s::timestamp[]) AS v(member_id, start_date)
+             WHERE h.member_id = v.member_id
+               AND h.end_date IS NULL
+        """, (
+            self.env.uid,
+            [member.id for member, _old, _start, _end in transitions],
+            [member_start for _member, _old, member_start, _end in transitions],
+        ))
+        History.invalidate_model(['end_date', 'write_uid', 'write_date'])
+
+        # 2️⃣ Neue Einträge anlegen (ein INSERT)
+        History.create([{
+            'member_id': member.id,
+            'state_id': new_state.id,
+            'start_date': member_start,
+            'end_date': member_end,
             'reason': reason,
-        })
+        } for member, _old, member_start, member_end in transitions])
+
+        # 3️⃣ Log-Einträge gesammelt schreiben
+        self.env['club.log'].log_events([{
+            'scope_type': 'member',
+            'activity_type': 'state_change',
+            'model': self._name,
+            'res_id': member.id,
+            'res_name': member.display_name,
+            'description': _("Member state changed from '%(old_state)s' to '%(new_state)s'") % {
+                'old_state': old_state.name,
+                'new_state': new_state.name,
+            },
+            'old_value': str({
+                'state_id': old_state.id,
+                'state_name': old_state.name,
+            }),
+            'new_value': str({
+                'state_id': new_state.id,
+                'state_name': new_state.name,
+                'start_date': member_start,
+                'end_date': member_end,
+                'reason': reason,
+            }),
+            'changes': {'current_state_id': [old_state.id or None, new_state.id]},
+        } for member, old_state, member_start, member_end in transitions])
+
+        return len(transitions)
 
     #######################################
     # MEMBER MEMBERSHIP - Functionalities
     #######################################
     @api.depends('membership_history_ids.date_start', 'membership_history_ids.date_end', 'membership_history_ids.active')
     def _compute_current_membership(self):
-        today = fields.Date.context_today(self)
+        current_memberships = self._get_current_membership_rows()
         for member in self:
-            current_membership = self.env['club.member.membership.history'].search([
-                ('member_id', '=', member.id),
-                ('date_start', '<=', today),
-                '|', ('date_end', '=', False), ('date_end', '>=', today),
-                ('active', '=', True)
-            ], order='date_start DESC, id DESC', limit=1)
-
-            member.current_membership_id = current_membership.membership_id if current_membership else False
-            member.membership_date_start = current_membership.date_start if current_membership else False
-            member.membership_date_end   = current_membership.date_end if current_membership else False
+            membership_id, date_start, date_end = current_memberships.get(member._origin.id, (False, False, False))
+            member.current_membership_id = membership_id
+            member.membership_date_start = date_start
+            member.membership_date_end   = date_end
+
+    def _get_current_membership_rows(self, at_date=None):
+        """Ermittelt die aktuelle Mitgliedschaft für alle Member des Recordsets
+        per Stichtag mit einer einzigen Abfrage über den daterange GiST-Index.
+        Returns: {member_id: (membership_id, date_start, date_end)}
+        """
+        member_ids = [mid for mid in self._origin.ids if mid]
+        if not member_ids:
+            return {}
+
+        at_date = at_date or fields.Date.context_today(self)
+        self.env['club.member.membership.history'].flush_model(['member_id', 'membership_id', 'date_start', 'date_end', 'active'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (member_id) member_id, membership_id, date_start, date_end
+              FROM club_member_membership_history
+             WHERE member_id = ANY(%s)
+               AND active
+               AND daterange(date_start, date_end, '[]') @> %s::date
+          ORDER BY member_id, date_start DESC, id DESC
+        """, (member_ids, at_date))
+        return {row[0]: row[1:] for row in self.env.cr.fetchall()}
 
     def set_membership(self, membership_id, date_start=None, date_end=None, note=None):
-        self.ensure_one()
+        """Setzt die Mitgliedschaft für alle Member des Recordsets (z.B. beim
+        Saisonwechsel) mit je einem write() und create() für den ganzen Batch.
+        Die aktuelle Mitgliedschaft wird über die Abhängigkeit auf die
+        Historie neu berechnet."""
+        if not self:
+            return
         if not date_start:
             date_start = fields.Date.context_today(self)
+        membership = self.env['club.member.membership'].browse(membership_id)
+        old_memberships = {member.id: member.current_membership_id for member in self}
 
-        current_active_membership = self.membership_history_ids.filtered(lambda r: r.active and r.date_start <= date_start and (not r.date_end or r.date_end >= date_start))
-        if current_active_membership:
-            current_active_membership.write({
+        current_active_memberships = self.membership_history_ids.filtered(lambda r: r.active and r.date_start <= date_start and (not r.date_end or r.date_end >= date_start))
+        if current_active_memberships:
+            current_active_memberships.write({
                 'active': False,
                 'date_end': date_start,
             })
+            # Vor dem Insert schreiben, sonst greift der Exclusion Constraint
+            current_active_memberships.flush_recordset()
 
-        self.env['club.member.membership.history'].create({
-            'member_id': self.id,
-            'membership_id': membership_id,
-            'date_start': date_start,
-            'date_end': date_end,
-            'note': note,
-        })
-
-        self.env['club.log'].log_event(
-            scope_type='member',
-            activity_type='update',
-            model=self._name,
-            res_id=self.id,
-            res_name=self.display_name,
-            description=_("Membership changed to %s") % self.env['club.member.membership'].browse(membership_id).name,
-            old_value=self.current_membership_id.name if self.current_membership_id else 'None',
-            new_value=self.env['club.member.membership'].browse(membership_id).name
-        )
-
-        self._compute_current_membership()
+        vals_list = []
+        for member in self:
+            member_date_end = date_end
+            if not member_date_end:
+                # Eine bereits geplante spätere Mitgliedschaft begrenzt die neue (Übergabetag)
+                next_membership = member.membership_history_ids.filtered(
+                    lambda r: r.active and r.date_start > date_start
+                ).sorted('date_start')[:1]
+                member_date_end = next_membership.date_start or None
+            vals_list.append({
+                'member_id': member.id,
+                'membership_id': membership_id,
+                'date_start': date_start,
+                'date_end': member_date_end,
+                'notes': note,
+            })
+        self.env['club.member.membership.history'].create(vals_list)
+
+        self.env['club.log'].log_events([{
+            'scope_type': 'member',
+            'activity_type': 'update',
+            'model': self._name,
+            'res_id': member.id,
+            'res_name': member.display_name,
+            'description': _("Membership changed to %s") % membership.name,
+            'old_value': old_memberships[member.id].name or 'None',
+            'new_value': membership.name,
+            'changes': {'current_membership_id': [old_memberships[member.id].id or None, membership_id]},
+        } for member in self])
 
     def end_current_membership(self, end_date=None, note=None):
-        self.ensure_one()
+        """Beendet die aktuelle Mitgliedschaft aller Member des Recordsets mit
+        einem write()."""
         if not end_date:
             end_date = fields.Date.context_today(self)
 
-        current_active_membership = self.membership_history_ids.filtered(lambda r: r.active and r.date_start <= end_date and (not r.date_end or r.date_end >= end_date))
-        if current_active_membership:
-            current_active_membership.write({
-                'active': False,
-                'date_end': end_date,
-                'note': note,
-            })
-
-            self.env['club.log'].log_event(
-                scope_type='member',
-                activity_type='update',
-                model=self._name,
-                res_id=self.id,
-                res_name=self.display_name,
-                description=_("Membership Ended: %s") % current_active_membership.membership_id.name,
-                old_value=current_active_membership.membership_id.name,
-                new_value='None'
-            )
-
-        self._compute_current_membership()
\ No newline at end of file
+        current_active_memberships = self.membership_history_ids.filtered(lambda r: r.active and r.date_start <= end_date and (not r.date_end or r.date_end >= end_date))
+        if not current_active_memberships:
+            return
+        vals = {'active': False, 'date_end': end_date}
+        if note:
+            vals['notes'] = note
+        current_active_memberships.write(vals)
+
+        self.env['club.log'].log_events([{
+            'scope_type': 'member',
+            'activity_type': 'update',
+            'model': self._name,
+            'res_id': history.member_id.id,
+            'res_name': history.member_id.display_name,
+            'description': _("Membership Ended: %s") % history.membership_id.name,
+            'old_value': history.membership_id.name,
+            'new_value': 'None',
+            'changes': {'current_membership_id': [history.membership_id.id, None]},
+        } for history in current_active_memberships])
\ No newline at end of file
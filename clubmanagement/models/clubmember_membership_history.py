@@ -20,6 +20,120 @@ class ClubMemberMembershipHistory(models.Model):
     def init(self):
         _logger.info('Initializing model: %s', self._name)
         super().init()
+        # Index für inkrementelle Regel-Auswertung (Änderungen seit Watermark)
+        self.env.cr.execute("CREATE INDEX IF NOT EXISTS club_member_membership_history_write_date_idx ON club_member_membership_history (write_date)")
+        # GiST-Index für Stichtags-Abfragen der aktuellen Mitgliedschaft
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS club_member_membership_history_period_idx
+            ON club_member_membership_history USING gist (daterange(date_start, date_end, '[]'))
+            WHERE active
+        """)
+        self._init_period_exclusion_constraint()
+
+    def _init_period_exclusion_constraint(self):
+        """Aktive Mitgliedschaften eines Members dürfen sich nicht überlappen.
+        Das Enddatum ist der Übergabetag: eine Folge-Mitgliedschaft darf am
+        Endtag der vorherigen beginnen, daher '[)'. Bestehende Überlappungen
+        bereinigt die Migration 18.0.0.3.0 (benötigt btree_gist).
+        """
+        cr = self.env.cr
+        cr.execute("""
+            SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conname = 'club_member_membership_history_no_overlap'
+        """)
+        row = cr.fetchone()
+        if row and "'[)'" in row[0]:
+            return
+        if row:
+            # Frühere Version mit inklusivem Enddatum
+            cr.execute("ALTER TABLE club_member_membership_history DROP CONSTRAINT club_member_membership_history_no_overlap")
+
+        cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        cr.execute("""
+            ALTER TABLE club_member_membership_history
+            ADD CONSTRAINT club_member_membership_history_no_overlap
+            EXCLUDE USING gist (member_id WITH =, daterange(date_start, date_end, '[)') WITH &&)
+            WHERE (active)
+        """)
+
+    def _check_period_overlap(self, periods):
+        """Prüft [(member_id, date_start, date_end, record_id), ...] mit einer
+        Abfrage gegen die bestehenden aktiven Mitgliedschaften und
+        untereinander, bevor der Exclusion Constraint mit einem IntegrityError
+        greift. Die geprüften Einträge selbst zählen mit ihren neuen Werten."""
+        if not periods:
+            return
+        self.flush_model(['member_id', 'date_start', 'date_end', 'active'])
+        member_ids, starts, ends, record_ids = zip(*periods)
+        self.env.cr.execute("""
+            WITH p AS (
+                SELECT * FROM unnest(%(member_ids)s::int[], %(starts)s::date[], %(ends)s::date[], %(record_ids)s::int[])
+                       WITH ORDINALITY AS p(member_id, date_start, date_end, record_id, position)
+            )
+            SELECT p.member_id, h.date_start, h.date_end
+              FROM p
+              JOIN club_member_membership_history h
+                ON h.member_id = p.member_id AND h.active AND h.id != ALL(%(record_ids)s::int[])
+               AND daterange(h.date_start, h.date_end, '[)') && daterange(p.date_start, p.date_end, '[)')
+            UNION ALL
+            SELECT a.member_id, b.date_start, b.date_end
+              FROM p a
+              JOIN p b
+                ON b.member_id = a.member_id AND b.position > a.position
+               AND daterange(b.date_start, b.date_end, '[)') && daterange(a.date_start, a.date_end, '[)')
+             LIMIT 1
+        """, {
+            'member_ids': list(member_ids),
+            'starts': list(starts),
+            'ends': [date_end or None for date_end in ends],
+            'record_ids': [record_id or 0 for record_id in record_ids],
+        })
+        overlap = self.env.cr.fetchone()
+        if overlap:
+            member = self.env['club.member'].browse(overlap[0])
+            raise ValidationError(_("The membership period of %(member)s overlaps with the membership from %(start)s to %(end)s.") % {
+                'member': member.display_name,
+                'start': overlap[1],
+                'end': overlap[2] or _('open end'),
+            })
+
+    ################################
+    # CREATE / WRITE / UNLINK HOOKS
+    #-------------------------------
+    # Änderungen gelten für 'change'-Regeln als Änderung von membership_history_ids
+    ################################
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._check_period_overlap([
+            (vals['member_id'], vals.get('date_start') or fields.Date.context_today(self), vals.get('date_end'), None)
+            for vals in vals_list
+            if vals.get('member_id') and vals.get('active', True)
+        ])
+        records = super(ClubMemberMembershipHistory, self).create(vals_list)
+        self.env['club.member.state.rule']._queue_field_changes(records.member_id, ['membership_history_ids'])
+        return records
+
+    def write(self, vals):
+        if any(name in vals for name in ('member_id', 'date_start', 'date_end', 'active')):
+            self._check_period_overlap([
+                (
+                    vals.get('member_id', record.member_id.id),
+                    vals.get('date_start', record.date_start),
+                    vals.get('date_end', record.date_end),
+                    record.id,
+                )
+                for record in self
+                if vals.get('active', record.active)
+            ])
+        members = self.member_id
+        res = super(ClubMemberMembershipHistory, self).write(vals)
+        self.env['club.member.state.rule']._queue_field_changes(members | self.member_id, ['membership_history_ids'])
+        return res
+
+    def unlink(self):
+        members = self.member_id
+        res = super(ClubMemberMembershipHistory, self).unlink()
+        self.env['club.member.state.rule']._queue_field_changes(members.exists(), ['membership_history_ids'])
+        return res
 
     @api.constrains('date_start', 'date_end')
     def _check_dates(self):
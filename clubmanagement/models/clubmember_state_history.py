@@ -19,6 +19,40 @@ class ClubMemberStateHistory(models.Model):
     def init(self):
         _logger.info('Initializing model: %s', self._name)
         super().init()
+        # Index für inkrementelle Regel-Auswertung (Änderungen seit Watermark)
+        self.env.cr.execute("CREATE INDEX IF NOT EXISTS club_member_state_history_write_date_idx ON club_member_state_history (write_date)")
+        # Index für den aktuellen Status (DISTINCT ON je Member). Nicht partiell:
+        # die Abfrage sucht offene UND noch nicht beendete Einträge
+        # (end_date IS NULL OR end_date > now), das kann ein Index mit
+        # WHERE end_date IS NULL nicht bedienen.
+        self.env.cr.execute("DROP INDEX IF EXISTS club_member_state_history_open_idx")
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS club_member_state_history_member_start_idx
+            ON club_member_state_history (member_id, start_date DESC, id DESC)
+        """)
+
+    ################################
+    # CREATE / WRITE / UNLINK HOOKS
+    #-------------------------------
+    # Änderungen gelten für 'change'-Regeln als Änderung von state_history_ids
+    ################################
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(ClubMemberStateHistory, self).create(vals_list)
+        self.env['club.member.state.rule']._queue_field_changes(records.member_id, ['state_history_ids'])
+        return records
+
+    def write(self, vals):
+        members = self.member_id
+        res = super(ClubMemberStateHistory, self).write(vals)
+        self.env['club.member.state.rule']._queue_field_changes(members | self.member_id, ['state_history_ids'])
+        return res
+
+    def unlink(self):
+        members = self.member_id
+        res = super(ClubMemberStateHistory, self).unlink()
+        self.env['club.member.state.rule']._queue_field_changes(members.exists(), ['state_history_ids'])
+        return res
 
     @api.constrains('start_date', 'end_date')
     def _check_dates(self):
@@ -1,12 +1,54 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.osv import expression
+from odoo.tools.safe_eval import safe_eval
 
-from datetime import datetime
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import calendar
+import importlib
+import multiprocessing
+import os
+import signal
+import sys
+import textwrap
+import threading
 import time
 
+from psycopg2 import errors as pg_errors
+
 import logging
 _logger = logging.getLogger(__name__)
 
+DEFAULT_RULE_RUN_CHUNK_SIZE = 1000
+
+# Zeitbudget (Defaults der Systemparameter); pro Member standardmäßig aus
+DEFAULT_MEMBER_BUDGET_MS = 0
+DEFAULT_RUN_BUDGET_S = 3600
+DEFAULT_BUDGET_STRIKES = 3
+# Ab so vielen übersprungenen Membern wird eine Regel für den Rest des Laufs ausgesetzt
+MAX_BUDGET_SKIPS_PER_RUN = 10
+
+# Konfiguration, die Worker-Prozesse für den Registry-Aufbau benötigen
+# Worker-Modul der parallelen Auswertung (ausserhalb von odoo.addons, siehe dort)
+SHARD_WORKER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'worker')
+SHARD_WORKER_MODULE = 'club_state_rule_worker'
+SHARD_CONFIG_KEYS = [
+    'addons_path', 'data_dir', 'db_host', 'db_port', 'db_user', 'db_password', 'db_sslmode', 'db_maxconn',
+]
+
+# Sammelt pro Transaktion die von 'change'-Regeln auszuwertenden Member
+PENDING_CHANGES_KEY = 'club.member.state.rule.pending_changes'
+# Regel-Felder, die den Cache der 'change'-Regeln ungültig machen
+CHANGE_RULE_FIELDS = ['active', 'apply_on', 'watched_field_ids']
+
+WATERMARK_RESET_FIELDS = [
+    'condition', 'condition_type', 'condition_domain', 'condition_date_field_id', 'condition_date_offset',
+    'new_state_id', 'incremental', 'trigger_date_field_ids', 'trigger_date_offset', 'trigger_on_birthday',
+]
+
 class ClubMemberStateRule(models.Model):
     _name = 'club.member.state.rule'
     _description = 'Member State Change Rule'
@@ -18,10 +60,18 @@ class ClubMemberStateRule(models.Model):
 
     apply_on    = fields.Selection([
                     ('registration', 'On Registration'),
-                    ('periodic', 'Periodic Check')
+                    ('periodic', 'Periodic Check'),
+                    ('change', 'On Field Change')
                 ], string='Apply Rule on', default='periodic', required=True)
-                
-    cron_id      = fields.Many2one(string='Associated Cron Job', comodel_name="ir.cron", readonly=True)
+
+    watched_field_ids = fields.Many2many(string='Watched Fields', comodel_name='ir.model.fields',
+                    relation='club_member_state_rule_watched_field_rel', column1='rule_id', column2='field_id',
+                    domain="[('model', '=', 'club.member'), ('store', '=', True)]",
+                    help="The rule is evaluated for members whose watched fields are changed, once per transaction. "
+                         "Use 'Membership History' or 'Member State History' to react to membership or state changes.")
+
+    scheduled    = fields.Boolean(string='Run in Scheduler', default=True,
+                    help="Periodic rules are applied by the shared member state scheduler. Uncheck to pause this rule.")
 
     new_state_id = fields.Many2one(string='New State', comodel_name='club.member.state', required=True)
 
@@ -40,8 +90,70 @@ class ClubMemberStateRule(models.Model):
 return True, None, None
     ''')
 
+    condition_type  = fields.Selection([
+                        ('python', 'Python Code'),
+                        ('domain', 'Domain (SQL)')
+                    ], string='Condition Type', default='python', required=True,
+                    help="Domain conditions are evaluated as a single SQL query and applied in bulk. "
+                         "Use Python Code only for custom logic.")
+
+    condition_domain        = fields.Char(string='Domain Condition', default='[]')
+    condition_date_field_id = fields.Many2one(string='Date Field', comodel_name='ir.model.fields', ondelete='set null',
+                                domain="[('model', '=', 'club.member'), ('ttype', 'in', ('date', 'datetime')), ('store', '=', True)]",
+                                help="Optional: only match members whose date lies more than 'Days Offset' days in the past")
+    condition_date_offset   = fields.Integer(string='Days Offset', default=0)
+
     reason          = fields.Text(string='Reason for Change')
 
+    last_run_date       = fields.Datetime(string='Last Run', readonly=True)
+    last_run_matched    = fields.Integer(string='Matched Members (Last Run)', readonly=True)
+    last_run_errors     = fields.Integer(string='Errors (Last Run)', readonly=True)
+    last_run_duration   = fields.Float(string='Duration in s (Last Run)', readonly=True)
+    simulation_date         = fields.Datetime(string='Last Simulation', readonly=True)
+    simulation_evaluated    = fields.Integer(string='Evaluated Members', readonly=True)
+    simulation_matched      = fields.Integer(string='Matched Members', readonly=True)
+    simulation_errors       = fields.Integer(string='Errors', readonly=True)
+    simulation_duration     = fields.Float(string='Wall Time (s)', readonly=True)
+    simulation_p50_ms       = fields.Float(string='p50 per Member (ms)', readonly=True, digits=(16, 3))
+    simulation_p99_ms       = fields.Float(string='p99 per Member (ms)', readonly=True, digits=(16, 3))
+    simulation_result       = fields.Text(string='State Transitions', readonly=True)
+
+    last_run_skipped    = fields.Integer(string='Skipped Members (Last Run)', readonly=True,
+                            help="Members skipped because evaluating the condition exceeded the time budget")
+    budget_strikes      = fields.Integer(string='Time Budget Strikes', readonly=True, default=0,
+                            help="Consecutive scheduler runs in which this rule exceeded the time budget per member. "
+                                 "The rule is archived automatically when the configured limit is reached.")
+    run_cursor          = fields.Integer(string='Resume Cursor (Member)', readonly=True, default=0,
+                            help="Last member processed by an interrupted scheduler run. The next run resumes after it.")
+
+    incremental             = fields.Boolean(string='Incremental Evaluation', default=False,
+                                help="Scheduler runs only evaluate members changed since the last completed run "
+                                     "or reaching one of the date triggers. Time based conditions (e.g. days since a date) "
+                                     "need a date trigger, otherwise unchanged members are never re-evaluated. "
+                                     "A full scan can be started manually.")
+    watermark               = fields.Datetime(string='Evaluated Until', readonly=True,
+                                help="Start of the last completed scheduler run. Empty means the next run is a full scan.")
+    trigger_date_field_ids  = fields.Many2many(string='Date Triggers', comodel_name='ir.model.fields',
+                                relation='club_member_state_rule_trigger_field_rel', column1='rule_id', column2='field_id',
+                                domain="[('model', '=', 'club.member'), ('ttype', 'in', ('date', 'datetime')), ('store', '=', True)]",
+                                help="Re-evaluate members when one of these dates (plus the offset) is reached")
+    trigger_date_offset     = fields.Integer(string='Date Trigger Offset (Days)', default=0)
+    trigger_on_birthday     = fields.Boolean(string='Re-evaluate on Birthday', default=False,
+                                help="Re-evaluate members on their birthday, e.g. for age based rules")
+
+    @api.model
+    def init(self):
+        _logger.info('Initializing model: %s', self._name)
+        super().init()
+        # Einzelne Cron Jobs pro Regel wurden durch den gemeinsamen Scheduler ersetzt
+        legacy_crons = self.env['ir.cron'].sudo().with_context(active_test=False).search([
+            ('model_id.model', '=', self._name),
+            ('code', '=like', 'model._run_rule(%'),
+        ])
+        if legacy_crons:
+            _logger.info('Removing %s legacy member state rule cron jobs', len(legacy_crons))
+            legacy_crons.unlink()
+
 
     ################################
     # CREATE HOOK
@@ -49,152 +161,934 @@ return True, None, None
     @api.model_create_multi
     def create(self, vals_list):
         rules = super(ClubMemberStateRule, self).create(vals_list)
-
-        for rule in rules:
-            if rule.apply_on == 'periodic':
-                rule._create_cron_job()
-
+        if rules._has_change_rules():
+            self.env.registry.clear_cache()
         return rules
 
-    def _create_cron_job(self):
-        self.ensure_one()
-        if not self.cron_id:
-            cron = self.env['ir.cron'].sudo().create({
-                'name': f"Check Member State: {self.name}",
-                'model_id': self.env['ir.model'].search(['model', '=', self._name], limit=1).id,
-                'state': 'code',
-                'code': f"model._run_rule({self.id})",
-                'interval_number': 1,
-                'interval_type': 'days',
-                'numbercall': -1,
-                'doall': False,
-                'active': self.active,
-            })
-            self.cron_id = cron
-
     ################################
     # WRITE HOOK
     ################################
     def write(self, vals):
+        if any(field in vals for field in WATERMARK_RESET_FIELDS):
+            # Geänderte Regel: nächster Lauf wertet wieder alle Member aus
+            vals = dict(vals, watermark=False)
+
+        # Kompilierte Bedingungen sind auf den Quelltext gecacht; verworfen werden
+        # nur die beobachteten Felder, wenn 'change'-Regeln betroffen sind
+        # (bisher oder nach dem Schreiben)
+        watched_changed = any(field in vals for field in CHANGE_RULE_FIELDS) and (
+            self._has_change_rules() or vals.get('apply_on') == 'change'
+        )
+
         res = super(ClubMemberStateRule, self).write(vals)
 
-        if 'apply_on' in vals or 'active' in vals:
-            for rule in self:
-                if rule.apply_on == 'periodic' and rule.active:
-                    rule._create_cron_job()
-                else:
-                    rule._unlink_cron_job()
+        if watched_changed:
+            self.env.registry.clear_cache()
+
         return res
 
     ################################
     # UNLINK HOOK
     ################################
     def unlink(self):
+        watched_changed = self._has_change_rules()
+        res = super(ClubMemberStateRule, self).unlink()
+        if watched_changed:
+            self.env.registry.clear_cache()
+        return res
+
+    def _has_change_rules(self):
+        return any(rule.apply_on == 'change' for rule in self)
+
+    ################################
+    # SCHEDULER
+    ################################
+    @api.model
+    def _cron_run_periodic_rules(self):
+        """Gemeinsamer Scheduler für alle aktiven periodischen Regeln."""
+        rules = self.search([
+            ('active', '=', True),
+            ('apply_on', '=', 'periodic'),
+            ('scheduled', '=', True),
+        ])
+        if not rules:
+            return {}
+
+        run_date = fields.Datetime.now()
+        stats = rules._run_rules(auto_commit=True)
+        for rule in rules:
+            rule_stats = stats[rule.id]
+            rule.write({
+                'last_run_date': run_date,
+                'last_run_matched': rule_stats['matched'],
+                'last_run_errors': rule_stats['errors'],
+                'last_run_skipped': rule_stats['skipped'],
+                'last_run_duration': rule_stats['duration'],
+            })
+        rules._update_budget_strikes(stats)
+
+        _logger.info(
+            "Member state rules: %s rules, %s members matched, %s errors in %.2fs",
+            len(rules),
+            sum(rule_stats['matched'] for rule_stats in stats.values()),
+            sum(rule_stats['errors'] for rule_stats in stats.values()),
+            sum(rule_stats['duration'] for rule_stats in stats.values()),
+        )
+        return stats
+
+    def action_run_full_scan(self):
+        """Wendet die Regel(n) auf den gesamten Memberbestand an."""
+        self._run_rules(full_scan=True)
+        return {
+            'type': "ir.actions.client",
+            'tag': 'reload',
+        }
+
+    def action_simulate(self):
+        """Dry-Run der ausgewählten Regeln, siehe _simulate()."""
+        self._simulate()
+        return {
+            'type': "ir.actions.client",
+            'tag': 'reload',
+        }
+
+    def _simulate(self, members=None):
+        """Wertet die Regeln wie ein vollständiger Lauf gegen die aktuellen
+        Daten aus (None = alle Member), verwirft aber sämtliche Änderungen.
+        Treffer, Statusübergänge, Laufzeit, p50/p99 der Auswertungszeit pro
+        Member und Fehler werden auf den Regeln gespeichert.
+        Returns: {rule_id: {...}}
+        """
+        rules = self.sorted(lambda r: (r.sequence, r.id))
+        stats = rules._init_stats()
+        simulation = {rule.id: {'timings': [], 'transitions': Counter()} for rule in rules}
+        Member = self.env['club.member']
+        member_ids = members.ids if members is not None else Member.search([], order='id').ids
+
+        savepoint = self.env.cr.savepoint()
+        try:
+            conditions = rules._get_condition_functions(stats)
+            for chunk in tools.split_every(self._get_chunk_size(), member_ids, Member.browse):
+                rules._run_rules_chunk(chunk, conditions, stats, simulation=simulation)
+                self.env.flush_all()
+                Member.invalidate_model()
+        finally:
+            savepoint.close(rollback=True)
+            self.env.invalidate_all()
+
+        simulation_date = fields.Datetime.now()
+        for rule in rules:
+            timings = sorted(simulation[rule.id]['timings'])
+            transitions = simulation[rule.id]['transitions']
+            rule.write({
+                'simulation_date': simulation_date,
+                'simulation_evaluated': len(timings),
+                'simulation_matched': stats[rule.id]['matched'],
+                'simulation_errors': stats[rule.id]['errors'],
+                'simulation_duration': stats[rule.id]['duration'],
+                'simulation_p50_ms': _percentile(timings, 50) * 1000,
+                'simulation_p99_ms': _percentile(timings, 99) * 1000,
+                'simulation_result': "\n".join(
+                    f"{old_state} → {new_state}: {count}"
+                    for (old_state, new_state), count in transitions.most_common()
+                ),
+            })
+            stats[rule.id].update(simulation[rule.id])
+        return stats
+
+    @api.model
+    def _get_chunk_size(self):
+        chunk_size = self.env['ir.config_parameter'].sudo().get_param('clubmanagement.state_rule_chunk_size')
+        try:
+            chunk_size = int(chunk_size) if chunk_size else DEFAULT_RULE_RUN_CHUNK_SIZE
+        except ValueError:
+            chunk_size = DEFAULT_RULE_RUN_CHUNK_SIZE
+        return chunk_size if chunk_size > 0 else DEFAULT_RULE_RUN_CHUNK_SIZE
+
+    def _run_rules(self, members=None, auto_commit=False, full_scan=False):
+        """Wendet alle Regeln des Recordsets in einem einzigen Durchlauf an.
+        Die Member werden chunkweise in `sequence`-Reihenfolge durch alle
+        Regeln geschleust. Ohne `members` wird der Bestand per
+        Keyset-Pagination (member.id) gelesen; der Fortschritt wird in
+        `run_cursor` gespeichert, damit ein abgebrochener Lauf fortgesetzt
+        werden kann. Mit `auto_commit` wird nach jedem Chunk committed.
+        Inkrementelle Regeln werten dabei nur Member aus, die sich seit
+        ihrem `watermark` geändert haben (ausser bei `full_scan`, der auch
+        einen gespeicherten `run_cursor` verwirft).
+        Returns: {rule_id: {'matched': int, 'errors': int, 'duration': float}}
+        """
+        rules = self.sorted(lambda r: (r.sequence, r.id))
+        stats = rules._init_stats()
+        chunk_size = self._get_chunk_size()
+
+        conditions = rules._get_condition_functions(stats)
+
+        if members is not None:
+            for chunk in tools.split_every(chunk_size, members.ids, members.browse):
+                rules._run_rules_chunk(chunk, conditions, stats)
+            return stats
+
+        Member = self.env['club.member']
+        run_started = self.env.cr.now()
+        run_budget = self._get_run_budget()
+        run_timer = time.time()
+        if full_scan:
+            # Ein vollständiger Scan beginnt immer beim ersten Member, auch
+            # nach einem abgebrochenen Lauf
+            rules.filtered('run_cursor').write({'run_cursor': 0})
+        cursors = {rule.id: rule.run_cursor for rule in rules}
+        cursor = min(cursors.values(), default=0)
+        resumed = bool(cursor)
+        if resumed:
+            _logger.info("Resuming member state rules after member id %s", cursor)
+
+        candidates = {} if full_scan else rules._get_incremental_candidates()
+        scan_domain = []
+        if candidates and len(candidates) == len(rules):
+            scan_domain = [('id', 'in', list(set().union(*candidates.values())))]
+
+        budget_exhausted = False
+
+        workers = self._get_worker_count()
+        if workers > 1 and conditions:
+            member_ids = Member.search([('id', '>', cursor)] + scan_domain, order='id').ids
+            if len(member_ids) >= workers * chunk_size:
+                deadline = run_timer + run_budget if run_budget else None
+                cursor = rules._run_rules_parallel(member_ids, workers, conditions, stats, cursors, candidates, auto_commit, deadline)
+                if cursor is not None:
+                    _logger.warning("Member state rules exceeded the run time budget of %ss, stopping after member id %s", run_budget, cursor)
+                    budget_exhausted = True
+                    cursor = None
+
+        while cursor is not None:
+            # Ein zu langer Lauf ist kein Fehler einer Regel: kein Strike,
+            # der nächste Lauf setzt am Cursor fort
+            if run_budget and time.time() - run_timer > run_budget:
+                _logger.warning("Member state rules exceeded the run time budget of %ss, stopping after member id %s", run_budget, cursor)
+                budget_exhausted = True
+                break
+
+            chunk = Member.search([('id', '>', cursor)] + scan_domain, order='id', limit=chunk_size)
+            if not chunk:
+                break
+
+            rules._run_rules_chunk(chunk, conditions, stats, cursors, candidates)
+
+            cursor = chunk.ids[-1]
+            rules.filtered(lambda r: r.run_cursor < cursor).write({'run_cursor': cursor})
+            if auto_commit:
+                self.env.cr.commit()
+
+            # Speicher zwischen den Chunks freigeben
+            self.env.flush_all()
+            Member.invalidate_model()
+
+        # Bei erschöpftem Budget bleibt der Cursor stehen; der nächste Lauf setzt fort
+        if budget_exhausted:
+            return stats
+
+        # Watermark nur nach einem vollständigen, nicht fortgesetzten Lauf setzen,
+        # sonst gingen Änderungen während des abgebrochenen Laufs verloren.
+        # Regeln mit übersprungenen Membern (Zeitbudget, auch ausgesetzte
+        # Regeln) behalten ihren Watermark, damit diese Member erneut
+        # Kandidaten sind.
+        complete = rules.filtered(lambda r: not stats[r.id]['skipped'])
+        if resumed:
+            rules.write({'run_cursor': 0})
+        else:
+            (rules - complete).write({'run_cursor': 0})
+            complete.write({'run_cursor': 0, 'watermark': run_started})
+        if auto_commit:
+            self.env.cr.commit()
+        return stats
+
+    def _init_stats(self):
+        return {
+            rule.id: {'matched': 0, 'errors': 0, 'skipped': 0, 'duration': 0.0, 'over_budget': False}
+            for rule in self
+        }
+
+    def _get_condition_functions(self, stats):
+        """Kompilierte Bedingungen aller Python-Regeln: {rule_id: callable}"""
+        conditions = {}
+        for rule in self.filtered(lambda r: r.condition_type == 'python'):
+            try:
+                conditions[rule.id] = rule._get_condition_function(rule.condition or '', rule.name)
+            except Exception as e:
+                _logger.error(f"Error compiling condition of rule {rule.name}: {str(e)}")
+                stats[rule.id]['errors'] += 1
+        return conditions
+
+    def _run_rules_chunk(self, members, conditions, stats, cursors=None, candidates=None, changes=None, simulation=None):
+        """Wendet alle Regeln auf einen Chunk an. Member, die eine Regel in
+        einem abgebrochenen Lauf schon verarbeitet hat, werden übersprungen,
+        ebenso unveränderte Member bei inkrementellen Regeln.
+        Ist `changes` eine Liste, werden die angewendeten Statuswechsel als
+        (rule_id, [(member_id, start_date, end_date), ...]) protokolliert.
+        `simulation` sammelt pro Regel Auswertungszeiten und Statusübergänge.
+        """
+        member_budget = self._get_member_budget()
+        for rule in self:
+            if rule.condition_type == 'python' and rule.id not in conditions:
+                continue
+            if stats[rule.id]['skipped'] >= MAX_BUDGET_SKIPS_PER_RUN:
+                continue
+
+            rule_members = members
+            if cursors and cursors.get(rule.id):
+                rule_members = rule_members.filtered(lambda m: m.id > cursors[rule.id])
+            if candidates and rule.id in candidates:
+                rule_members = rule_members.filtered(lambda m: m.id in candidates[rule.id])
+            if not rule_members:
+                continue
+
+            timings = simulation[rule.id]['timings'] if simulation else None
+            started = time.time()
+            if rule.condition_type == 'domain':
+                # Pro Chunk nach den vorherigen Regeln auswerten: die Domain
+                # sieht deren Statuswechsel (Reihenfolge nach `sequence`)
+                matches, errors = rule._match_domain(rule_members)
+                if timings is not None:
+                    # Domain-Regeln laufen als eine Query: Zeit pro Member gemittelt
+                    timings.extend([(time.time() - started) / len(rule_members)] * len(rule_members))
+            else:
+                matches, errors, skipped = rule._match_python(rule_members, conditions[rule.id], timings, member_budget)
+                stats[rule.id]['skipped'] += skipped
+                if skipped:
+                    stats[rule.id]['over_budget'] = True
+            if simulation:
+                simulation[rule.id]['transitions'].update(
+                    (member.current_state_id.name or _('None'), rule.new_state_id.name) for member, _start, _end in matches
+                )
+            applied, apply_errors = rule._apply_state_changes(matches)
+            if changes is not None and matches:
+                changes.append((rule.id, [(member.id, start_date, end_date) for member, start_date, end_date in matches]))
+
+            stats[rule.id]['matched'] += applied
+            stats[rule.id]['errors'] += errors + apply_errors
+            stats[rule.id]['duration'] += time.time() - started
+
+    ################################
+    # EVENT DRIVEN RULES (apply_on = 'change')
+    ################################
+    @tools.ormcache()
+    def _get_watched_fields(self):
+        """{field_name: (rule_id, ...)} aller aktiven 'change'-Regeln"""
+        rules = self.sudo().search([('active', '=', True), ('apply_on', '=', 'change')])
+        watched = {}
+        for rule in rules:
+            for field in rule.watched_field_ids:
+                watched.setdefault(field.name, []).append(rule.id)
+        return {name: tuple(rule_ids) for name, rule_ids in watched.items()}
+
+    @api.model
+    def _queue_field_changes(self, members, field_names):
+        """Merkt Member für alle 'change'-Regeln vor, die eines der Felder
+        beobachten. Ausgewertet wird einmal pro Transaktion (pre-commit)."""
+        if not members or self.env.context.get('club_state_rule_no_events'):
+            return
+        watched = self._get_watched_fields()
+        rule_ids = {rule_id for name in field_names for rule_id in watched.get(name, ())}
+        if not rule_ids:
+            return
+
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get(PENDING_CHANGES_KEY)
+        if pending is None:
+            pending = precommit.data[PENDING_CHANGES_KEY] = {}
+            precommit.add(self._run_queued_changes)
+        for rule_id in rule_ids:
+            pending.setdefault(rule_id, set()).update(members.ids)
+
+    @api.model
+    def _run_queued_changes(self):
+        """Wertet die vorgemerkten 'change'-Regeln aus. Läuft als Superuser,
+        da die Statusänderung Systemlogik ist und nicht vom Recht des
+        ändernden Benutzers auf die Statushistorie abhängen darf."""
+        pending = self.env.cr.precommit.data.pop(PENDING_CHANGES_KEY, None)
+        if not pending:
+            return
+
+        # Änderungen durch die Regeln selbst lösen keine weiteren Auswertungen aus
+        rules = self.sudo().with_context(club_state_rule_no_events=True).browse(pending).exists()
+        Member = rules.env['club.member']
+        for rule in rules.filtered('active').sorted(lambda r: (r.sequence, r.id)):
+            members = Member.browse(sorted(pending[rule.id])).exists()
+            if members:
+                rule._run_rules(members)
+        self.env.flush_all()
+
+    @api.constrains('apply_on', 'watched_field_ids')
+    def _check_watched_fields(self):
+        for rule in self:
+            if rule.apply_on == 'change' and not rule.watched_field_ids:
+                raise ValidationError(_("Rule '%s' is applied on field change and needs at least one watched field.") % rule.name)
+
+    ################################
+    # TIME BUDGET / WATCHDOG
+    ################################
+    @api.model
+    def _get_int_param(self, key, default):
+        value = self.env['ir.config_parameter'].sudo().get_param(key)
+        try:
+            return int(value) if value not in (None, False, '') else default
+        except ValueError:
+            return default
+
+    @api.model
+    def _get_member_budget(self):
+        """Zeitbudget pro Member-Auswertung in Sekunden (None = unbegrenzt)."""
+        budget_ms = self._get_int_param('clubmanagement.state_rule_member_budget_ms', DEFAULT_MEMBER_BUDGET_MS)
+        return budget_ms / 1000.0 if budget_ms > 0 else None
+
+    @api.model
+    def _get_run_budget(self):
+        """Zeitbudget pro Scheduler-Lauf in Sekunden (None = unbegrenzt)."""
+        budget_s = self._get_int_param('clubmanagement.state_rule_run_budget_s', DEFAULT_RUN_BUDGET_S)
+        return budget_s if budget_s > 0 else None
+
+    def _update_budget_strikes(self, stats):
+        """Zählt Läufe mit Budgetüberschreitung; Regeln, die das Budget zu
+        oft in Folge überschreiten, werden archiviert und protokolliert."""
+        strike_limit = self._get_int_param('clubmanagement.state_rule_budget_strikes', DEFAULT_BUDGET_STRIKES)
         for rule in self:
-            rule._unlink_cron_job()
-        return super(ClubMemberStateRule, self).unlink()
+            if not stats[rule.id]['over_budget']:
+                if rule.budget_strikes:
+                    rule.budget_strikes = 0
+                continue
 
-    def _unlink_cron_job(self):
+            rule.budget_strikes += 1
+            if strike_limit > 0 and rule.budget_strikes >= strike_limit:
+                rule._disable_for_budget()
+
+    def _disable_for_budget(self):
         self.ensure_one()
-        if self.cron_id:
-            self.cron_id.unlink()
-            self.cron_id = False
+        _logger.warning(f"Rule {self.name} exceeded its time budget {self.budget_strikes} times in a row and has been archived")
+        self.active = False
+        self.env['club.log'].log_event(
+            scope_type='state_rule',
+            activity_type='system_action',
+            model=self._name,
+            res_id=self.id,
+            res_name=self.name,
+            description=_("Member state rule '%(rule)s' archived: time budget exceeded in %(strikes)s consecutive runs") % {
+                'rule': self.name,
+                'strikes': self.budget_strikes,
+            },
+        )
 
     ################################
-    # HELPER FUNCTIONS
+    # PARALLEL EVALUATION
     ################################
-    def _run_rule(self, rule_id):
-        rule = self.browse(rule_id)
-        if rule.exists() and rule.active:
-            members = self.env['club.member'].search([])
-            rule._apply_rule(members)
+    @api.model
+    def _get_worker_count(self):
+        workers = self.env['ir.config_parameter'].sudo().get_param('clubmanagement.state_rule_workers')
+        try:
+            return int(workers) if workers else 0
+        except ValueError:
+            return 0
+
+    def _run_rules_parallel(self, member_ids, workers, conditions, stats, cursors, candidates, auto_commit, deadline=None):
+        """Verteilt die Auswertung auf `workers` Prozesse.
+        Jeder Prozess wertet einen zusammenhängenden Bereich von Member IDs
+        mit eigenem Registry-Cursor aus und verwirft seine Transaktion.
+        Zurück kommen nur die Statuswechsel, die hier in Shard-Reihenfolge
+        angewendet werden (gleiche Reihenfolge wie im seriellen Lauf).
+        Jeder Prozess lädt eine eigene Registry (einige Sekunden und einige
+        hundert MB pro Prozess); das lohnt sich nur für grosse Läufe.
+        Zeitbudgets gelten wie im seriellen Lauf: das Budget pro Member in
+        jedem Prozess (die Aussetzgrenze MAX_BUDGET_SKIPS_PER_RUN pro Shard),
+        das Laufbudget über `deadline` (time.time()). Ein Shard, der die
+        Deadline erreicht, hört nach dem laufenden Chunk auf; ab dort werden
+        keine weiteren Shards übernommen.
+        Schlägt ein Shard fehl, zählt das als Fehler und Strike aller Regeln
+        und der Shard wird hier seriell ausgewertet.
+        Returns: Member ID, nach der der Lauf abgebrochen wurde, oder None
+        """
+        shard_size = -(-len(member_ids) // workers)
+        shards = [member_ids[i:i + shard_size] for i in range(0, len(member_ids), shard_size)]
+        config_options = {key: tools.config[key] for key in SHARD_CONFIG_KEYS if key in tools.config.options}
+        candidate_ids = {rule_id: list(ids) for rule_id, ids in candidates.items()}
+        Member = self.env['club.member']
+
+        _logger.info("Evaluating member state rules for %s members in %s processes", len(member_ids), len(shards))
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+            futures = [
+                executor.submit(
+                    _get_shard_worker(), self.env.cr.dbname, self.env.uid, dict(self.env.context), config_options,
+                    self.ids, shard, cursors, candidate_ids, deadline,
+                )
+                for shard in shards
+            ]
+            for shard, future in zip(shards, futures):
+                try:
+                    changes, shard_stats, last_id = future.result()
+                except Exception as e:
+                    _logger.error("Member state rule shard %s-%s failed, evaluating it sequentially: %s", shard[0], shard[-1], str(e))
+                    for rule_id in self.ids:
+                        stats[rule_id]['errors'] += 1
+                        stats[rule_id]['over_budget'] = True
+                    last_id = self._run_shard_chunks(shard, conditions, stats, cursors, candidates, deadline)
+                else:
+                    for rule_id, rule_stats in shard_stats.items():
+                        stats[rule_id]['errors'] += rule_stats['errors']
+                        stats[rule_id]['duration'] += rule_stats['duration']
+                        stats[rule_id]['skipped'] += rule_stats['skipped']
+                        stats[rule_id]['over_budget'] |= rule_stats['over_budget']
+
+                    for rule_id, rule_changes in changes:
+                        rule = self.browse(rule_id)
+                        applied, apply_errors = rule._apply_state_changes([
+                            (Member.browse(member_id), start_date, end_date)
+                            for member_id, start_date, end_date in rule_changes
+                        ])
+                        stats[rule_id]['matched'] += applied
+                        stats[rule_id]['errors'] += apply_errors
 
-    def _apply_rule(self, members):
+                # Cursor wie im seriellen Lauf: bis zum letzten ausgewerteten Member
+                cursor = last_id or 0
+                if cursor:
+                    self.filtered(lambda r: r.run_cursor < cursor).write({'run_cursor': cursor})
+                if auto_commit:
+                    self.env.cr.commit()
+                self.env.flush_all()
+                Member.invalidate_model()
+
+                if last_id != shard[-1]:
+                    # Laufbudget erschöpft: spätere Shards verwerfen, der
+                    # nächste Lauf setzt am Cursor fort
+                    for pending in futures:
+                        pending.cancel()
+                    return cursor
+        return None
+
+    def _evaluate_shard(self, member_ids, cursors, candidates, deadline=None):
+        """Wertet die Regeln für einen Shard aus (im Worker-Prozess).
+        Die Statuswechsel werden wirklich ausgeführt, damit nachfolgende
+        Regeln sie sehen; der Aufrufer verwirft die Transaktion danach.
+        Nach `deadline` (time.time()) werden keine weiteren Chunks begonnen.
+        Returns: (changes, stats, ID des letzten ausgewerteten Members)
+        """
+        rules = self.sorted(lambda r: (r.sequence, r.id))
+        stats = rules._init_stats()
+        conditions = rules._get_condition_functions(stats)
+        candidates = {rule_id: set(ids) for rule_id, ids in candidates.items()}
+        changes = []
+        last_id = rules._run_shard_chunks(member_ids, conditions, stats, cursors, candidates, deadline, changes)
+        return changes, stats, last_id
+
+    def _run_shard_chunks(self, member_ids, conditions, stats, cursors, candidates, deadline=None, changes=None):
+        """Wertet einen Shard chunkweise aus; nach `deadline` (time.time())
+        werden keine weiteren Chunks begonnen.
+        Returns: ID des letzten ausgewerteten Members (None = keiner)
+        """
+        Member = self.env['club.member']
+        last_id = None
+        for chunk in tools.split_every(self._get_chunk_size(), member_ids, Member.browse):
+            if deadline and time.time() > deadline:
+                break
+            self._run_rules_chunk(chunk, conditions, stats, cursors, candidates, changes)
+            last_id = chunk.ids[-1]
+            self.env.flush_all()
+            Member.invalidate_model()
+        return last_id
+
+    ################################
+    # INCREMENTAL EVALUATION
+    ################################
+    def _get_incremental_candidates(self):
+        """Ermittelt pro inkrementeller Regel die Member, die seit dem
+        Watermark geändert wurden oder eine Datumsschwelle erreicht haben.
+        Regeln ohne Watermark fehlen im Resultat (= voller Scan).
+        Returns: {rule_id: set(member_ids)}
+        """
+        self.env.flush_all()
+        today = fields.Date.context_today(self)
+        changed_by_watermark = {}
+        candidates = {}
+        for rule in self.filtered(lambda r: r.incremental and r.watermark):
+            if rule.watermark not in changed_by_watermark:
+                changed_by_watermark[rule.watermark] = self._get_changed_member_ids(rule.watermark)
+            candidates[rule.id] = changed_by_watermark[rule.watermark] | rule._get_date_trigger_member_ids(today)
+        return candidates
+
+    @api.model
+    def _get_changed_member_ids(self, watermark):
+        """Member mit Änderungen am Member, am Kontakt oder neuen bzw.
+        geänderten Status- und Mitgliedschafts-Einträgen seit `watermark`."""
+        self.env.cr.execute("""
+            SELECT m.id
+              FROM club_member m
+              JOIN res_partner p ON p.id = m.partner_id
+             WHERE m.write_date > %(watermark)s OR p.write_date > %(watermark)s
+            UNION
+            SELECT member_id FROM club_member_state_history WHERE write_date > %(watermark)s
+            UNION
+            SELECT member_id FROM club_member_membership_history WHERE write_date > %(watermark)s
+        """, {'watermark': watermark})
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    def _get_date_trigger_member_ids(self, today):
+        """Member, deren Trigger-Datum (plus Offset) seit dem Watermark
+        erreicht wurde, sowie Geburtstage im selben Zeitraum."""
         self.ensure_one()
+        window_start = self.watermark.date() - timedelta(days=1)
+        member_ids = set()
+
+        triggers = [(field, self.trigger_date_offset) for field in self.trigger_date_field_ids]
+        if self.condition_type == 'domain' and self.condition_date_field_id:
+            triggers.append((self.condition_date_field_id, self.condition_date_offset + 1))
+
+        Member = self.env['club.member']
+        for field, offset in triggers:
+            member_field = Member._fields.get(field.name)
+            if not member_field or not member_field.store or member_field.type not in ('date', 'datetime'):
+                continue
+            self.env.cr.execute(f"""
+                SELECT id FROM club_member
+                 WHERE ("{field.name}")::date + %s BETWEEN %s AND %s
+            """, (offset, window_start, today))
+            member_ids.update(row[0] for row in self.env.cr.fetchall())
+
+        if self.trigger_on_birthday:
+            member_ids.update(self._get_birthday_member_ids(window_start, today))
+
+        return member_ids
+
+    @api.model
+    def _get_birthday_member_ids(self, date_from, date_to):
+        """Member mit Geburtstag zwischen `date_from` und `date_to`."""
+        if (date_to - date_from).days >= 366:
+            self.env.cr.execute("""
+                SELECT m.id FROM club_member m JOIN res_partner p ON p.id = m.partner_id
+                 WHERE p.birthdate_date IS NOT NULL
+            """)
+            return {row[0] for row in self.env.cr.fetchall()}
+
+        month_days = set()
+        day = date_from
+        while day <= date_to:
+            month_days.add(day.strftime('%m-%d'))
+            # 29. Februar feiert in Nicht-Schaltjahren am 1. März
+            if day.month == 3 and day.day == 1 and not calendar.isleap(day.year):
+                month_days.add('02-29')
+            day += timedelta(days=1)
+
+        self.env.cr.execute("""
+            SELECT m.id FROM club_member m JOIN res_partner p ON p.id = m.partner_id
+             WHERE to_char(p.birthdate_date, 'MM-DD') = ANY(%s)
+        """, (list(month_days),))
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    def _match_python(self, members, condition, timings=None, budget=None):
+        """Wertet die kompilierte Python-Bedingung für jeden Member aus.
+        Bedingungen sind lesend: der Chunk läuft in einem einzigen Savepoint,
+        erst wenn dabei etwas fehlschlägt, wird Member für Member (mit je
+        eigenem Savepoint) wiederholt, wie in _apply_state_changes().
+        Ist `timings` eine Liste, wird die Auswertungszeit pro Member (s) angehängt.
+        Überschreitet eine Auswertung `budget` Sekunden, wird sie abgebrochen
+        und der Member übersprungen; nach MAX_BUDGET_SKIPS_PER_RUN
+        übersprungenen Membern wird die Regel für diesen Chunk ausgesetzt.
+        Returns: ([(member, start_date, end_date), ...], errors, skipped)
+        """
+        self.ensure_one()
+        timings_start = len(timings) if timings is not None else 0
+        try:
+            with self.env.cr.savepoint(), _statement_timeout(self.env.cr, budget):
+                results = [
+                    (member, self._evaluate_condition(member, condition, timings, budget))
+                    for member in members
+                ]
+            return self._collect_matches(results), 0, 0
+        except Exception as e:
+            _logger.info(f"Evaluating rule {self.name} for {len(members)} members failed, retrying per member: {str(e)}")
+            if timings is not None:
+                del timings[timings_start:]
+
+        results, errors, skipped = [], 0, 0
         for member in members:
+            if skipped >= MAX_BUDGET_SKIPS_PER_RUN:
+                break
             try:
-                result = eval(self.condition, {
-                    'member': member, 
-                    'env': self.env,
-                    'datetime': datetime
-                })
-                if isinstance(result, tuple) and len(result) == 3:
-                    apply_rule, start_date, end_date = result
-                    if apply_rule:
-                        self._change_member_state(member, self.new_state_id, self.reason, start_date, end_date)
-                else:
-                    _logger.warning(f"Invalid return format for rule {self.name}")
+                with self.env.cr.savepoint(), _statement_timeout(self.env.cr, budget):
+                    results.append((member, self._evaluate_condition(member, condition, timings, budget)))
+            except (RuleTimeBudgetExceeded, pg_errors.QueryCanceled):
+                _logger.warning(f"Rule {self.name} exceeded the time budget of {budget}s for member {member.name}, member skipped")
+                skipped += 1
             except Exception as e:
                 _logger.error(f"Error evaluating rule {self.name} for member {member.name}: {str(e)}")
+                errors += 1
+        return self._collect_matches(results), errors, skipped
 
+    def _evaluate_condition(self, member, condition, timings=None, budget=None):
+        started = time.perf_counter()
+        try:
+            with _time_budget(budget):
+                return condition(member=member, env=self.env, datetime=datetime)
+        finally:
+            if timings is not None:
+                timings.append(time.perf_counter() - started)
 
-    def _change_member_state(self, member, new_state, reason, start_date=None, end_date=None):
-        if member.current_state_id != new_state:
-            now = fields.Datetime.now()
-            start_date = start_date or now
-            
-            # End the current state
-            current_state_history = self.env['club.member.state.history'].search([
-                ('member_id', '=', member.id),
-                ('end_date', '=', False)
-            ], limit=1)
-            
-            if current_state_history:
-                current_state_history.write({
-                    'end_date': start_date,
-                })
+    def _collect_matches(self, results):
+        """[(member, result), ...] -> [(member, start_date, end_date), ...] der Treffer"""
+        matches = []
+        for member, result in results:
+            if isinstance(result, tuple) and len(result) == 3:
+                apply_rule, start_date, end_date = result
+                if apply_rule:
+                    matches.append((member, start_date, end_date))
+            else:
+                _logger.warning(f"Invalid return format for rule {self.name}")
+        return matches
 
-            # Create new state history entry
-            self.env['club.member.state.history'].create({
-                'member_id': member.id,
-                'state_id': new_state.id,
-                'start_date': start_date,
-                'end_date': end_date,
-                'reason': reason,
-            })
+    ################################
+    # DOMAIN CONDITIONS
+    ################################
+    def _get_condition_domain(self):
+        """Baut die Domain einer deklarativen Regel inkl. Datums-Offset.
+        Member, die bereits im Zielstatus sind, werden ausgeschlossen.
+        """
+        self.ensure_one()
+        domain = safe_eval(self.condition_domain or '[]', {
+            'datetime': datetime,
+            'timedelta': timedelta,
+            'context_today': lambda: fields.Date.context_today(self),
+        })
+
+        if self.condition_date_field_id:
+            if self.condition_date_field_id.ttype == 'datetime':
+                threshold = fields.Datetime.now() - timedelta(days=self.condition_date_offset)
+            else:
+                threshold = fields.Date.context_today(self) - timedelta(days=self.condition_date_offset)
+            domain = expression.AND([domain, [(self.condition_date_field_id.name, '<', threshold)]])
+
+        return expression.AND([domain, [('current_state_id', '!=', self.new_state_id.id)]])
+
+    def _match_domain(self, members=None):
+        """Ermittelt die passenden Member mit einer einzigen SQL-Abfrage.
+        Returns: ([(member, None, None), ...], errors)
+        """
+        self.ensure_one()
+        try:
+            domain = self._get_condition_domain()
+        except Exception as e:
+            _logger.error(f"Error evaluating domain of rule {self.name}: {str(e)}")
+            return [], 1
+
+        if members is not None:
+            domain = expression.AND([domain, [('id', 'in', members.ids)]])
+
+        return [(member, None, None) for member in self.env['club.member'].search(domain)], 0
+
+    def _apply_state_changes(self, matches):
+        """Setzt den Zielstatus der Regel für alle Treffer mit einem
+        Bulk-Statuswechsel. Schlägt dieser fehl, wird Member für Member
+        wiederholt, damit einzelne Fehler den Batch nicht blockieren.
+        Returns: (applied, errors)
+        """
+        self.ensure_one()
+        if not matches:
+            return 0, 0
+
+        members = self.env['club.member'].browse([member.id for member, _start, _end in matches])
+        member_dates = {member.id: (start_date, end_date) for member, start_date, end_date in matches}
+        try:
+            with self.env.cr.savepoint():
+                return members._bulk_change_state(self.new_state_id, self.reason, member_dates=member_dates), 0
+        except Exception as e:
+            _logger.warning(f"Bulk state change of rule {self.name} failed, retrying per member: {str(e)}")
+
+        applied, errors = 0, 0
+        for member in members:
+            try:
+                with self.env.cr.savepoint():
+                    applied += member._bulk_change_state(self.new_state_id, self.reason, member_dates=member_dates)
+            except Exception as e:
+                _logger.error(f"Error applying rule {self.name} for member {member.name}: {str(e)}")
+                errors += 1
+        return applied, errors
+
+    ################################
+    # CONDITION COMPILER
+    ################################
+    @api.model
+    @tools.ormcache('condition', 'name')
+    def _get_condition_function(self, condition, name):
+        """Kompiliert eine Bedingung einmalig und cached das Ergebnis pro
+        Quelltext: eine geänderte Bedingung ergibt einen neuen Schlüssel,
+        auch bei mehreren Änderungen in derselben Transaktion.
+        """
+        return self._compile_condition(condition, name)
+
+    @api.model
+    def _compile_condition(self, condition, name=None):
+        """Liefert ein Callable(member, env, datetime) für die Bedingung.
+        Reine Ausdrücke werden wie bisher ausgewertet, alle anderen
+        Bedingungen werden als Funktionskörper kompiliert (erlaubt `return`).
+        """
+        filename = f"<club.member.state.rule: {name or ''}>"
+        source = textwrap.dedent(condition or '').strip('\n')
 
-            # The current_state_id will be automatically updated due to the compute method
-
-            # Log the state change
-            self.env['club.log'].log_event(
-                scope_type='member',
-                activity_type='state_change',
-                model='club.member',
-                res_id=member.id,
-                res_name=member.display_name,
-                description=_("Member state changed from '%(old_state)s' to '%(new_state)s'") % {
-                    'old_state': member.current_state_id.name,
-                    'new_state': new_state.name,
-                },
-                old_value=str({
-                    'state_id': member.current_state_id.id,
-                    'state_name': member.current_state_id.name,
-                }),
-                new_value=str({
-                    'state_id': new_state.id,
-                    'state_name': new_state.name,
-                    'start_date': start_date,
-                    'end_date': end_date,
-                    'reason': reason,
+        try:
+            code = compile(source, filename, 'eval')
+        except SyntaxError:
+            code = None
+        if code is not None:
+            return lambda **kwargs: eval(code, dict(kwargs))
+
+        body = textwrap.indent(source, '    ') if source.strip() else ''
+        function_source = f"def _rule_condition(member, env, datetime):\n{body}\n    pass\n"
+        namespace = {}
+        exec(compile(function_source, filename, 'exec'), namespace)
+        return namespace['_rule_condition']
+
+    @api.constrains('condition', 'condition_type', 'condition_domain')
+    def _check_condition(self):
+        for rule in self:
+            if rule.condition_type == 'domain':
+                try:
+                    self.env['club.member']._search(rule._get_condition_domain())
+                except Exception as e:
+                    raise ValidationError(_("Invalid domain condition in rule '%(rule)s': %(error)s") % {
+                        'rule': rule.name,
+                        'error': e,
+                    })
+                continue
+            try:
+                self._compile_condition(rule.condition, rule.name)
+            except SyntaxError as e:
+                raise ValidationError(_("Invalid Python condition in rule '%(rule)s': %(error)s") % {
+                    'rule': rule.name,
+                    'error': e,
                 })
-            )
 
     @api.model
     def _apply_registratoin_rules(self, members):
         rules = self.search([('active', '=', True), ('apply_on', '=', 'registration')])
 
-        if rules:
-            for rule in rules:
-                rule._apply_rule(members)
+        if rules and self._defer_registration_rules():
+            # Vorläufiger Status sofort, Regeln später im Hintergrund
+            members._bulk_change_state(self._get_registered_state(), start_date=fields.Date.today())
+            self._queue_registration_rules(members)
+
+        elif rules:
+            rules._run_rules(members)
 
         else:
-            registered_state = self.env['club.member.state'].search([('state_type', '=', 'registered')], limit=1)
-            if registered_state:
-                for member in members:
-                    self.env['club.member.state.history'].create({
-                        'member_id': member.id,
-                        'state_id': registered_state.id,
-                        'start_date': fields.Date.today(),
-                    })
-            else:
-                raise UserError(_('Club Member State not configured. Please configure at least one state with type "registered"'))
\ No newline at end of file
+            members._bulk_change_state(self._get_registered_state(), start_date=fields.Date.today())
+
+    @api.model
+    def _get_registered_state(self):
+        registered_state = self.env['club.member.state'].search([('state_type', '=', 'registered')], limit=1)
+        if not registered_state:
+            raise UserError(_('Club Member State not configured. Please configure at least one state with type "registered"'))
+        return registered_state
+
+    ################################
+    # DEFERRED REGISTRATION RULES
+    ################################
+    @api.model
+    def _defer_registration_rules(self):
+        return bool(self.env['ir.config_parameter'].sudo().get_param('clubmanagement.defer_registration_rules'))
+
+    @api.model
+    def _queue_registration_rules(self, members):
+        """Merkt Member für die Hintergrundverarbeitung vor (ohne write(),
+        damit kein Audit-Log und keine 'change'-Regeln ausgelöst werden)."""
+        self.env.cr.execute(
+            "UPDATE club_member SET registration_rules_pending = TRUE WHERE id = ANY(%s)",
+            [members.ids],
+        )
+        members.invalidate_recordset(['registration_rules_pending'])
+        cron = self.env.ref('clubmanagement.ir_cron_club_member_registration_rules', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_run_registration_rules(self):
+        """Wendet die Registrierungsregeln auf alle vorgemerkten Member an,
+        chunkweise und mit Commit pro Chunk."""
+        rules = self.search([('active', '=', True), ('apply_on', '=', 'registration')])
+        Member = self.env['club.member']
+        chunk_size = self._get_chunk_size()
+        processed = 0
+        started = time.time()
+
+        while True:
+            members = Member.search([('registration_rules_pending', '=', True)], order='id', limit=chunk_size)
+            if not members:
+                break
+            if rules:
+                rules._run_rules(members)
+            self.env.cr.execute(
+                "UPDATE club_member SET registration_rules_pending = FALSE WHERE id = ANY(%s)",
+                [members.ids],
+            )
+            members.invalidate_recordset(['registration_rules_pending'])
+            self.env.cr.commit()
+            processed += len(members)
+
+        if processed:
+            _logger.info("Deferred registration rules applied to %s members in %.2fs", processed, time.time() - started)
+
+
+class RuleTimeBudgetExceeded(Exception):
+    """Eine Regel-Bedingung hat ihr Zeitbudget überschritten."""
+
+
+@contextmanager
+def _time_budget(seconds):
+    """Bricht den umschlossenen Code mit RuleTimeBudgetExceeded ab, sobald
+    er länger als `seconds` läuft. Ein SIGALRM-Timer unterbricht auch
+    Schleifen ohne Funktionsaufrufe, kostet aber nichts pro Aufruf.
+    Signale gibt es nur im Haupt-Thread (Prefork-Worker); in Threads
+    greift nur das SQL-Limit aus _statement_timeout().
+    """
+    if not seconds or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def _alarm(signum, frame):
+        raise RuleTimeBudgetExceeded()
+
+    previous_handler = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+@contextmanager
+def _statement_timeout(cr, seconds):
+    """Begrenzt jede SQL-Abfrage des Blocks auf `seconds` (statement_timeout).
+    Muss innerhalb eines Savepoints laufen: bei einem Fehler setzt dessen
+    Rollback den Wert zurück, sonst wird der vorherige Wert wiederhergestellt.
+    """
+    if not seconds:
+        yield
+        return
+
+    cr.execute("SHOW statement_timeout")
+    previous = cr.fetchone()[0]
+    cr.execute("SELECT set_config('statement_timeout', %s, true)", [f"{int(seconds * 1000)}ms"])
+    yield
+    cr.execute("SELECT set_config('statement_timeout', %s, true)", [previous])
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-Rank Perzentil einer sortierten Liste (0.0 wenn leer)."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def _get_shard_worker():
+    """Worker-Funktion der parallelen Auswertung, importierbar auch in
+    frisch gestarteten Prozessen, bevor der Addons-Pfad eingerichtet ist."""
+    if SHARD_WORKER_PATH not in sys.path:
+        sys.path.append(SHARD_WORKER_PATH)
+    return importlib.import_module(SHARD_WORKER_MODULE).evaluate_rules_shard
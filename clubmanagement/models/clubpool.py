@@ -11,46 +11,49 @@ class ClubPool(models.Model):
         'mail.thread',
         'mail.activity.mixin',
         'club.log.mixin',
+        'club.org.unit.mixin',
+        'club.orgchart.mixin',
     ]
+    _closure_fields = ('member_ids', 'active', 'department_id')
 
     name                = fields.Char(string='Name', required=True, tracking=True)
     club_id             = fields.Many2one(string='Club', comodel_name='club.club', store=True, readonly=True, default=lambda self: self.env['club.club'].search([], limit=1).id)
     company_id          = fields.Many2one(string='Company', comodel_name='res.company', required=True, default=lambda self: self.env.company)
-    department_id       = fields.Many2one(string='Department', comodel_name='club.department', required=True, tracking=True)
+    department_id       = fields.Many2one(string='Department', comodel_name='club.department', required=True, tracking=True, group_expand='_read_group_department_id')
     hr_department_id    = fields.Many2one(string='HR Department', comodel_name='hr.department', help='Optional HR department mapping for HR processes', tracking=True)
     sequence            = fields.Integer(string='Sequence', required=True, default=10)
     team_ids            = fields.One2many(string='Teams', comodel_name='club.team', inverse_name='pool_id')
     team_count          = fields.Integer(string='Team Count', compute="_compute_team_count", store=True)
     role_ids            = fields.One2many(string='Roles / Functions', comodel_name='club.role', inverse_name='pool_id')
     member_ids          = fields.Many2many(string='Members', comodel_name='club.member', relation='club_pool_member_rel', column1='pool_id', column2='member_id', tracking=True)
-    member_ids_display  = fields.Many2many(string='All Members', comodel_name='club.member', compute='_compute_member_ids', store=True)
-    member_count        = fields.Integer(string='Member Count', compute="_compute_member_ids", store=True)
+    member_ids_display  = fields.Many2many(string='All Members', comodel_name='club.member', compute='_compute_member_ids', search='_search_member_ids_display')
+    member_count        = fields.Integer(string='Member Count', compute="_compute_member_count")
     active              = fields.Boolean(default=True, tracking=True)
 
-    _group_by_full      = {'department_id': lambda self, *args, **kwargs: self._read_group_department_id(*args, **kwargs), }
-
     @api.model
     def init(self):
         _logger.info('Initializing model: %s', self._name)
         super().init()
 
-    @api.depends('team_ids')
+    @api.depends('team_ids', 'team_ids.active')
     def _compute_team_count(self):
+        counts = self._get_child_counts('club.team', 'pool_id')
         for pool in self:
-            pool.team_count = len(pool.team_ids)
+            pool.team_count = counts.get(pool.id, 0)
 
-    @api.depends('member_ids', 'team_ids.member_ids_display')
+    @api.depends('member_ids', 'team_ids.member_ids')
     def _compute_member_ids(self):
+        # Aus der Member-Closure (club.org.closure), eine Query für alle Pools
+        closure = self._get_closure_member_ids()
         for pool in self:
-            direct = pool.member_ids
-            team_member = pool.team_ids.mapped('member_ids_display')
-            all_members = direct | team_member
-            pool.member_ids_display = [(6, 0, all_members.ids)]
-            pool.member_count = len(pool.member_ids_display)
+            pool.member_ids_display = [(6, 0, closure.get(pool.id, []))]
 
-    @api.model
-    def _read_group_department_id(self, departments, domain, order):
-        return self.env['club.department'].search([])
+    @api.depends('member_ids', 'team_ids.member_ids')
+    def _compute_member_count(self):
+        # Ein GROUP BY über die Closure, ohne die Member-IDs zu laden
+        counts = self._get_closure_member_counts()
+        for pool in self:
+            pool.member_count = counts.get(pool.id, 0)
 
 
     ########################
@@ -10,6 +10,7 @@ class ClubRole(models.Model):
     _inherit = [
         'mail.thread',
         'mail.activity.mixin',
+        'club.orgchart.mixin',
     ]
     
     name            = fields.Char(string='Name', required=True, store=True)
@@ -12,7 +12,10 @@ class SubClub(models.Model):
         'mail.thread',
         'mail.activity.mixin',
         'club.log.mixin',
+        'club.org.unit.mixin',
+        'club.orgchart.mixin',
     ]
+    _closure_fields = ('member_ids', 'active', 'club_id')
 
     name                = fields.Char(string='Name', required=True, tracking=True)
     company_id          = fields.Many2one(string='Company', comodel_name='res.company', required=True, default=lambda self: self.env.company)
@@ -23,34 +26,39 @@ class SubClub(models.Model):
     department_ids      = fields.One2many(string='Departments', comodel_name='club.department', inverse_name='subclub_id', tracking=True)
     role_ids            = fields.One2many(string='Roles / Functions', comodel_name='club.role', inverse_name='subclub_id', tracking=True)
     member_ids          = fields.Many2many(string='Members', comodel_name='club.member', relation='club_subclub_member_rel', column1='subclub_id', column2='member_id', tracking=True)
-    member_ids_display  = fields.Many2many(string='All Members', comodel_name='club.member', compute='_compute_member_ids')
+    member_ids_display  = fields.Many2many(string='All Members', comodel_name='club.member', compute='_compute_member_ids', search='_search_member_ids_display')
     active              = fields.Boolean(default=True, tracking=True)
 
-    boards_count        = fields.Integer(string='No Boards', compute="_compute_counts")
-    departments_count   = fields.Integer(string='No Departments', compute="_compute_counts")
-    roles_count         = fields.Integer(string='No Roles', compute="_compute_counts")
-    members_count       = fields.Integer(string='No Members', compute="_compute_counts")
+    # Gespeicherte Zähler; members_count führt die Member-Closure nach
+    boards_count        = fields.Integer(string='No Boards', compute="_compute_counts", store=True)
+    departments_count   = fields.Integer(string='No Departments', compute="_compute_counts", store=True)
+    roles_count         = fields.Integer(string='No Roles', compute="_compute_counts", store=True)
+    members_count       = fields.Integer(string='No Members', compute="_compute_counts", store=True)
 
     @api.model
     def init(self):
         _logger.info('Initializing model: %s', self._name)
         super().init()
 
-    @api.depends('member_ids', 'department_ids.member_ids_display')
+    @api.depends('member_ids', 'department_ids.member_ids')
     def _compute_member_ids(self):
+        # Aus der Member-Closure (club.org.closure), eine Query für alle Subclubs
+        closure = self._get_closure_member_ids()
         for subclub in self:
-            direct = subclub.member_ids
-            dept_members = subclub.department_ids.mapped('member_ids_display')
-            all_members = direct | dept_members
-            subclub.member_ids_display = [(6, 0, all_members.ids)]
+            subclub.member_ids_display = [(6, 0, closure.get(subclub.id, []))]
 
-    @api.depends('board_ids', 'department_ids', 'role_ids', 'member_ids_display')
+    @api.depends('board_ids', 'board_ids.active', 'department_ids', 'department_ids.active', 'role_ids', 'role_ids.active')
     def _compute_counts(self):
+        # Je Untermodell ein GROUP BY statt die One2many-Felder zu laden
+        boards = self._get_child_counts('club.board', 'subclub_id')
+        departments = self._get_child_counts('club.department', 'subclub_id')
+        roles = self._get_child_counts('club.role', 'subclub_id')
+        members = self._get_closure_member_counts()
         for subclub in self:
-            subclub.boards_count = len(subclub.board_ids)
-            subclub.departments_count = len(subclub.department_ids)
-            subclub.roles_count = len(subclub.role_ids)
-            subclub.members_count = len(subclub.member_ids_display)
+            subclub.boards_count = boards.get(subclub.id, 0)
+            subclub.departments_count = departments.get(subclub.id, 0)
+            subclub.roles_count = roles.get(subclub.id, 0)
+            subclub.members_count = members.get(subclub.id, 0)
 
     ########################
     # PERMISSION CHECK
@@ -1,4 +1,4 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, Command, _
 from odoo.exceptions import ValidationError
 
 import logging
@@ -11,23 +11,23 @@ class ClubTeam(models.Model):
         'mail.thread',
         'mail.activity.mixin',
         'club.log.mixin',
+        'club.org.unit.mixin',
+        'club.orgchart.mixin',
     ]
-    _group_by_full = {
-        'department_id': lambda self, departments, domain, order: self._read_group_department_id(departments, domain, order),
-    }
+    _closure_fields = ('member_ids', 'active', 'pool_id', 'department_id')
 
     name                    = fields.Char(required=True, tracking=True)
     shortname               = fields.Char(string='Short Name', required=False, size=5, help='Short code, max 5 characters', tracking=True)
     company_id              = fields.Many2one(string='Company', comodel_name='res.company', required=True, default=lambda self: self.env.company)
     club_id                 = fields.Many2one(string='Club', comodel_name='club.club', store=True, readonly=True, default=lambda self: self.env['club.club'].search([], limit=1).id)
-    department_id           = fields.Many2one(string='Department', comodel_name='club.department', required=True, tracking=True)
+    department_id           = fields.Many2one(string='Department', comodel_name='club.department', required=True, tracking=True, group_expand='_read_group_department_id')
     pool_id                 = fields.Many2one(string='Pool', comodel_name='club.pool', required=False, tracking=True)
     hr_department_id        = fields.Many2one(string='HR Department', comodel_name='hr.department', help='Optional HR department mapping for HR processes', tracking=True)
     sequence                = fields.Integer(string='Sequence', required=True, default=10)
     role_ids                = fields.One2many(string='Roles / Functions', comodel_name='club.role', inverse_name='team_id')
     member_ids              = fields.Many2many(string='Members', comodel_name='club.member', relation='club_team_member_rel', column1='team_id', column2='member_id', tracking=True)
-    member_ids_display      = fields.Many2many(string='All Members', comodel_name='club.member', compute='_compute_member_ids', store=True)
-    members_count           = fields.Integer(string='Member Cound', compute="_compute_member_ids", store=True)
+    member_ids_display      = fields.Many2many(string='All Members', comodel_name='club.member', compute='_compute_member_ids', search='_search_member_ids_display')
+    members_count           = fields.Integer(string='Member Cound', compute="_compute_member_count")
     active                  = fields.Boolean(default=True, tracking=True)
 
     price                   = fields.Monetary(string='Price', compute="_compute_price", store=True, currency_field='currency_id')
@@ -41,24 +41,6 @@ class ClubTeam(models.Model):
         _logger.info('Initializing model: %s', self._name)
         super().init()
 
-    @api.model
-    def _read_group_department_id(self, departments, domain, order):
-        return self.env['club.department'].search([('company_id', '=', self.env.company.id)], order=order)
-
-    @api.model
-    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
-        if 'department_id' in groupby:
-            departments = self.env['club.department'].search([('company_id', '=', self.env.company.id)])
-            result = [{
-                '__domain': [('department_id', '=', department.id), ('company_id', '=', self.env.company.id)],
-                'department_id': (department.id, department.name),
-                'department_id_count': self.search_count([('department_id', '=', department.id), ('company_id', '=', self.env.company.id)]),
-                '__count': self.search_count([('department_id', '=', department.id), ('company_id', '=', self.env.company.id)])
-            } for department in departments]
-            return result
-        return super(ClubTeam, self).read_group(domain, fields, groupby, offset=offset, limit=limit, orderby=orderby, lazy=lazy)
-
-
     @api.depends('shortname')
     def _check_shortname_length(self):
         for record in self:
@@ -68,9 +50,17 @@ class ClubTeam(models.Model):
 
     @api.depends('member_ids')
     def _compute_member_ids(self):
+        # Aus der Member-Closure (club.org.closure), eine Query für alle Teams
+        closure = self._get_closure_member_ids()
+        for team in self:
+            team.member_ids_display = [(6, 0, closure.get(team.id, []))]
+
+    @api.depends('member_ids')
+    def _compute_member_count(self):
+        # Ein GROUP BY über die Closure, ohne die Member-IDs zu laden
+        counts = self._get_closure_member_counts()
         for team in self:
-            team.member_ids_display = [(6, 0, team.member_ids.ids)]
-            team.members_count = len(team.member_ids)
+            team.members_count = counts.get(team.id, 0)
 
     @api.depends('main_product_id')
     def _compute_main_product_price(self):
@@ -88,6 +78,31 @@ class ClubTeam(models.Model):
                 total_price += sum(product.product_tmpl_id.list_price for product in team.additional_product_ids)
             team.price = total_price
 
+    ########################
+    # ROSTER BATCH
+    ########################
+    @api.model
+    def apply_roster(self, moves):
+        """Verschiebt viele Member auf einmal zwischen Teams.
+        moves: [(member_id, from_team_id or False, to_team_id or False), ...]
+        Pro Team genau ein write(); die Hierarchie wird einmal am Ende
+        abgeglichen (roster_batch).
+        """
+        commands = {}
+        for member_id, from_team_id, to_team_id in moves:
+            if from_team_id == to_team_id:
+                continue
+            if from_team_id:
+                commands.setdefault(from_team_id, []).append(Command.unlink(member_id))
+            if to_team_id:
+                commands.setdefault(to_team_id, []).append(Command.link(member_id))
+
+        with self.env['club.org.closure'].roster_batch() as batch_env:
+            teams = batch_env['club.team'].browse(commands)
+            for team in teams:
+                team.write({'member_ids': commands[team.id]})
+        return len(commands)
+
     ########################
     # CREATE HOOK
     ########################
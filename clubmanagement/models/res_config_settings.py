@@ -11,6 +11,30 @@ class ResConfigSettings(models.TransientModel):
     start_member_id         = fields.Integer(string='Start Member ID', config_parameter="clubmanagement.start_member_id")
     start_member_id_set     = fields.Boolean(string='Start Member ID set', compute='_compute_start_member_id_set')
 
+    state_rule_chunk_size   = fields.Integer(string='Member State Rule Chunk Size', config_parameter="clubmanagement.state_rule_chunk_size", default=1000,
+                                help="Number of members processed and committed per batch by the member state scheduler")
+
+    state_rule_workers      = fields.Integer(string='Member State Rule Worker Processes', config_parameter="clubmanagement.state_rule_workers", default=0,
+                                help="Evaluate Python state rules in this many parallel processes on large databases (0 or 1 = disabled). "
+                                     "Each process loads its own registry; the time budgets also apply to parallel runs.")
+
+    state_rule_member_budget_ms = fields.Integer(string='Time Budget per Member (ms)', config_parameter="clubmanagement.state_rule_member_budget_ms", default=0,
+                                help="Member state rule conditions running longer are aborted and the member is skipped (0 = unlimited). "
+                                     "Uses a timer signal in scheduler worker processes and a SQL statement timeout.")
+    state_rule_run_budget_s     = fields.Integer(string='Time Budget per Run (s)', config_parameter="clubmanagement.state_rule_run_budget_s", default=3600,
+                                help="Scheduler runs stop after this time and resume on the next run (0 = unlimited)")
+    state_rule_budget_strikes   = fields.Integer(string='Budget Strikes before Archiving', config_parameter="clubmanagement.state_rule_budget_strikes", default=3,
+                                help="Rules exceeding their time budget in this many consecutive runs are archived (0 = never)")
+
+    defer_registration_rules    = fields.Boolean(string='Defer Registration Rules', config_parameter="clubmanagement.defer_registration_rules",
+                                help="New members get the registered state immediately; registration rules are applied by a background job")
+
+    log_payload_limit           = fields.Integer(string='Audit Log Payload Limit', config_parameter="clubmanagement.log_payload_limit", default=4096,
+                                help="Maximum number of characters per text value stored in an audit log diff; lists are capped as well (0 = unlimited)")
+
+    log_archive_months          = fields.Integer(string='Archive Audit Log after (Months)', config_parameter="clubmanagement.log_archive_months", default=0,
+                                help="Monthly audit log partitions older than this are exported to the filestore and detached (0 = never)")
+
     club_api_rate_limit_enabled = fields.Boolean(
         string="Enable API Rate Limit",
         config_parameter="club.api.rate_limit_enabled",
@@ -32,9 +56,11 @@ class ResConfigSettings(models.TransientModel):
             record.start_member_id_set = bool(param)
 
     def set_values(self):
-        super(ResConfigSettings, self).set_values()
+        # Vor super() lesen: super() speichert den neuen Wert bereits im Systemparameter
         param = self.env['ir.config_parameter'].sudo().get_param('clubmanagement.start_member_id')
-        if not param and self.start_member_id:
-            self.env['ir.config_parameter'].sudo().set_param('clubmanagement.start_member_id', self.start_member_id)
-        elif param and self.start_member_id != int(param):
-            raise ValidationError(_("Start Member ID cannot be changed once set."))
\ No newline at end of file
+        if param and self.start_member_id != int(param):
+            raise ValidationError(_("Start Member ID cannot be changed once set."))
+        super(ResConfigSettings, self).set_values()
+        if self.start_member_id and self.start_member_id != int(param or 0):
+            # Nur beim erstmaligen Setzen des Startwerts, nicht bei jedem Speichern
+            self.env['club.member']._sync_member_id_sequence()
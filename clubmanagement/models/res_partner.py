@@ -15,6 +15,15 @@ class ResPartner(models.Model):
         _logger.info('Initializing model: %s', self._name)
         super().init()
 
+    def write(self, vals):
+        res = super(ResPartner, self).write(vals)
+        # Namen der Rolleninhaber stehen im Org Chart
+        if 'name' in vals and 'club.role' in self.env:
+            roles = self.env['club.role'].sudo().search([('member_id.partner_id', 'in', self.ids)])
+            if roles:
+                self.env['club.orgchart']._bump_orgchart_version(roles.company_id.ids)
+        return res
+
     def _compute_is_club_member(self):
         # Mapping aller partner_ids, die in club.member existieren
         member_partners = self.env["club.member"].sudo().search([]).mapped("partner_id.id")
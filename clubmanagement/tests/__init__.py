@@ -0,0 +1 @@
+from . import test_org_closure
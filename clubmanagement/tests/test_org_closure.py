@@ -0,0 +1,121 @@
+from odoo.tests.common import TransactionCase, new_test_user, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestOrgClosure(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if not cls.env['club.member.state'].search([('state_type', '=', 'registered')], limit=1):
+            cls.env['club.member.state'].create({'name': 'Registered', 'code': 'TEST_REGISTERED', 'state_type': 'registered'})
+        cls.club = cls.env['club.club'].search([], limit=1) or cls.env['club.club'].create({'name': 'Test Club'})
+
+        subclub = cls.env['club.subclub'].search([('active', '=', True)], limit=1)
+        cls.department = cls.env['club.department'].create({'name': 'Juniors', 'subclub_id': subclub.id})
+        cls.pool_a = cls.env['club.pool'].create({'name': 'Pool A', 'department_id': cls.department.id})
+        cls.pool_b = cls.env['club.pool'].create({'name': 'Pool B', 'department_id': cls.department.id})
+        cls.team = cls.env['club.team'].create({
+            'name': 'U12', 'department_id': cls.department.id, 'pool_id': cls.pool_a.id,
+        })
+        cls.member_1 = cls._create_member('Anna Muster', team_ids=[cls.team.id])
+        cls.member_2 = cls._create_member('Beat Muster', team_ids=[cls.team.id])
+
+    @classmethod
+    def _create_member(cls, name, **vals):
+        partner = cls.env['res.partner'].create({'name': name})
+        return cls.env['club.member'].create(dict(vals, partner_id=partner.id))
+
+    def _closure_units(self, member, unit_model):
+        return set(self.env['club.org.closure'].search([
+            ('member_id', '=', member.id), ('unit_model', '=', unit_model),
+        ]).mapped('unit_id'))
+
+    def test_propagation(self):
+        for unit in (self.team, self.pool_a, self.department):
+            self.assertEqual(unit.member_ids_display, self.member_1 | self.member_2)
+        self.assertEqual(self.team.members_count, 2)
+        self.assertEqual(self.pool_a.member_count, 2)
+        self.assertEqual(self.department.member_count, 2)
+        self.assertFalse(self.pool_b.member_ids_display)
+
+    def test_move_team_between_pools(self):
+        self.team.pool_id = self.pool_b
+        self.assertEqual(self._closure_units(self.member_1, 'club.pool'), {self.pool_b.id})
+        self.assertFalse(self.pool_a.member_ids_display)
+        self.assertEqual(self.pool_b.member_count, 2)
+        # Department bleibt über den Pool erreichbar
+        self.assertEqual(self.department.member_count, 2)
+
+    def test_archive_member(self):
+        self.member_2.active = False
+        self.assertEqual(self.team.member_ids_display, self.member_1)
+        self.assertEqual(self.department.member_count, 1)
+
+    def test_archive_team(self):
+        self.team.active = False
+        # Das archivierte Team behält seine Zeilen, gibt die Member aber nicht weiter
+        self.assertEqual(self._closure_units(self.member_1, 'club.team'), {self.team.id})
+        self.assertFalse(self._closure_units(self.member_1, 'club.pool'))
+        self.assertFalse(self.pool_a.member_ids_display)
+
+        self.team.active = True
+        self.assertEqual(self.pool_a.member_ids_display, self.member_1 | self.member_2)
+
+    def test_unlink_member(self):
+        subclub = self.env['club.subclub'].create({
+            'name': 'Test Subclub',
+            'hr_department_id': self.env['hr.department'].create({'name': 'Test Subclub'}).id,
+        })
+        (self.member_1 | self.member_2).write({'subclub_ids': [(4, subclub.id)]})
+        self.assertEqual(subclub.members_count, 2)
+
+        member_id = self.member_2.id
+        self.member_2.unlink()
+        self.assertFalse(self.env['club.org.closure'].search_count([('member_id', '=', member_id)]))
+        self.assertEqual(self.pool_a.member_ids_display, self.member_1)
+        self.assertEqual(self.team.members_count, 1)
+        self.assertEqual(self.department.member_count, 1)
+        self.assertEqual(subclub.members_count, 1)
+
+    def test_search_member_ids_display(self):
+        self.assertEqual(
+            self.env['club.pool'].search([('member_ids_display', 'in', self.member_1.ids)]),
+            self.pool_a,
+        )
+
+    def test_roster_batch_defers_refresh(self):
+        Closure = self.env['club.org.closure']
+        with Closure.roster_batch() as batch_env:
+            batch_env['club.member'].browse(self.member_1.id).write({'team_ids': [(5, 0, 0)]})
+            batch_env['club.member'].browse(self.member_2.id).write({'pool_ids': [(4, self.pool_b.id)]})
+            # Noch nicht abgeglichen
+            self.assertEqual(self._closure_units(self.member_1, 'club.team'), {self.team.id})
+        self.assertFalse(self._closure_units(self.member_1, 'club.team'))
+        self.assertEqual(self._closure_units(self.member_2, 'club.pool'), {self.pool_a.id, self.pool_b.id})
+        self.assertNotIn('club.org.closure.pending', self.env.cr.precommit.data)
+
+    def test_roster_batch_failure(self):
+        Closure = self.env['club.org.closure']
+        with self.assertRaises(ValueError):
+            with Closure.roster_batch() as batch_env:
+                batch_env['club.member'].browse(self.member_1.id).write({'team_ids': [(5, 0, 0)]})
+                raise ValueError('batch failed')
+        # Kein vorgemerkter Abgleich bleibt hängen, die Closure ist aktuell
+        self.assertNotIn('club.org.closure.pending', self.env.cr.precommit.data)
+        self.assertFalse(self._closure_units(self.member_1, 'club.team'))
+
+    def test_record_rules(self):
+        self.env['ir.rule'].create({
+            'name': 'Test: only Anna',
+            'model_id': self.env['ir.model']._get_id('club.member'),
+            'domain_force': "[('id', '=', %s)]" % self.member_1.id,
+        })
+        user = new_test_user(self.env, login='club_closure_user', groups='clubmanagement.group_clubmanagement_user')
+        team = self.team.with_user(user)
+        self.assertEqual(team.member_ids_display.ids, self.member_1.ids)
+        self.assertEqual(team.members_count, 1)
+        self.assertEqual(self.pool_a.with_user(user).member_count, 1)
+        self.assertFalse(
+            self.env['club.team'].with_user(user).search([('member_ids_display', 'in', self.member_2.ids)])
+        )
@@ -0,0 +1,26 @@
+"""Einstiegspunkt der Worker-Prozesse für die parallele Auswertung der
+Member-Statusregeln.
+
+Die Worker werden mit 'spawn' gestartet und importieren die Funktion beim
+Entpicklen über ihren Modulnamen. Dieses Modul liegt deshalb ausserhalb von
+odoo.addons (das Verzeichnis wird in sys.path eingetragen) und importiert
+nur die Standardbibliothek und odoo; das Addon selbst wird erst nach dem
+Einrichten des Addons-Pfads über die Registry geladen.
+"""
+
+
+def evaluate_rules_shard(dbname, uid, context, config_options, rule_ids, member_ids, cursors, candidates, deadline):
+    from odoo import api
+    from odoo.modules.module import initialize_sys_path
+    from odoo.modules.registry import Registry
+    from odoo.tools import config
+
+    config.options.update(config_options)
+    initialize_sys_path()
+
+    with Registry(dbname).cursor() as cr:
+        env = api.Environment(cr, uid, context)
+        try:
+            return env['club.member.state.rule'].browse(rule_ids)._evaluate_shard(member_ids, cursors, candidates, deadline)
+        finally:
+            cr.rollback()